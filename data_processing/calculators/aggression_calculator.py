@@ -8,9 +8,52 @@ Measures driver aggression through:
 """
 import pandas as pd
 import numpy as np
+from numba import njit
 from typing import Dict, List
 from calculators.base_calculator import BaseDNACalculator
 
+@njit(cache=True)
+def _late_race_gains(race_ids, lap_race_ids, lap_driver_ids, laps, positions, driver_id):
+    """
+    Positions gained in the late-race window of each race.
+    
+    Lap arrays must be sorted by (raceId, lap). Returns the gain per race and
+    a mask of races that had enough laps to be analyzed.
+    """
+    gains = np.empty(len(race_ids), dtype=np.float64)
+    valid = np.zeros(len(race_ids), dtype=np.bool_)
+    
+    for i in range(len(race_ids)):
+        start = np.searchsorted(lap_race_ids, race_ids[i], side='left')
+        end = np.searchsorted(lap_race_ids, race_ids[i], side='right')
+        if start == end:
+            continue
+        
+        # Need at least 10 laps for analysis
+        max_lap = laps[end - 1]
+        if max_lap < 10:
+            continue
+        
+        # Late race is the final 10 laps or final 20% of race, whichever is larger
+        late_race_threshold = max(max_lap - 9, int(max_lap * 0.8))
+        
+        first_position = np.nan
+        last_position = np.nan
+        late_laps = 0
+        for j in range(start, end):
+            if lap_driver_ids[j] == driver_id and laps[j] >= late_race_threshold:
+                if late_laps == 0:
+                    first_position = positions[j]
+                last_position = positions[j]
+                late_laps += 1
+        
+        # Need at least 2 laps to measure change
+        if late_laps >= 2:
+            gains[i] = first_position - last_position
+            valid[i] = True
+    
+    return gains, valid
+
 class AggressionCalculator(BaseDNACalculator):
     
     def __init__(self):
@@ -183,38 +226,18 @@ class AggressionCalculator(BaseDNACalculator):
             return np.nan
         
         # For each race, look at position changes in final 10 laps
-        late_race_scores = []
-        
-        for race_id in merged_data['raceId'].unique():
-            race_lap_times = lap_times[lap_times['raceId'] == race_id]
-            
-            if race_lap_times.empty:
-                continue
-            
-            # Get maximum lap number for this race
-            max_lap = race_lap_times['lap'].max()
-            
-            if max_lap < 10:  # Need at least 10 laps for analysis
-                continue
-            
-            # Define "late race" as final 10 laps or final 20% of race, whichever is larger
-            late_race_threshold = max(max_lap - 9, int(max_lap * 0.8))
-            
-            # Get driver's lap times in late race period
-            driver_late_laps = race_lap_times[
-                (race_lap_times['driverId'] == merged_data['driverId'].iloc[0]) &
-                (race_lap_times['lap'] >= late_race_threshold)
-            ].sort_values('lap')
-            
-            if len(driver_late_laps) < 2:  # Need at least 2 laps to measure change
-                continue
-            
-            # Calculate position changes in late race
-            first_late_position = driver_late_laps['position'].iloc[0]
-            final_late_position = driver_late_laps['position'].iloc[-1]
-            
-            late_race_gains = first_late_position - final_late_position
-            late_race_scores.append(late_race_gains)
+        race_ids = merged_data['raceId'].unique().astype(np.int64)
+        sorted_laps = lap_times.sort_values(['raceId', 'lap'])
+        
+        gains, valid = _late_race_gains(
+            race_ids,
+            sorted_laps['raceId'].to_numpy(dtype=np.int64),
+            sorted_laps['driverId'].to_numpy(dtype=np.int64),
+            sorted_laps['lap'].to_numpy(dtype=np.int64),
+            sorted_laps['position'].to_numpy(dtype=np.float64),
+            np.int64(merged_data['driverId'].iloc[0])
+        )
+        late_race_scores = gains[valid].tolist()
         
         if not late_race_scores:
             return np.nan
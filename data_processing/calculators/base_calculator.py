@@ -59,13 +59,13 @@ class BaseDNACalculator(ABC):
         """
         Apply exponential decay weighting based on year
         """
-        from utils.helpers import calculate_era_weights
+        from utils.helpers import calculate_era_weights_array
         
         if year_col not in df.columns:
             self.logger.warning(f"Year column '{year_col}' not found, skipping era weighting")
             return df[value_col] if value_col in df.columns else pd.Series()
         
-        weights = df[year_col].apply(calculate_era_weights)
+        weights = pd.Series(calculate_era_weights_array(df[year_col].to_numpy(dtype=float)), index=df.index)
         if value_col in df.columns:
             return df[value_col] * weights
         else:
@@ -9,9 +9,46 @@ Measures driver racecraft through:
 """
 import pandas as pd
 import numpy as np
+from numba import njit
 from typing import Dict, List, Tuple
 from .base_calculator import BaseDNACalculator
 
+@njit(cache=True)
+def _lap_position_stats(positions, starts, ends):
+    """
+    Lap-to-lap position change counts for each group of laps.
+    
+    Each group spans positions[starts[g]:ends[g]], ordered by lap. Returns one
+    row per group: laps, gains, total places gained, largest single gain,
+    laps held, laps lost, laps in the final third and gains in the final third.
+    """
+    stats = np.zeros((len(starts), 8), dtype=np.float64)
+    
+    for g in range(len(starts)):
+        start = starts[g]
+        end = ends[g]
+        stats[g, 0] = end - start
+        
+        for i in range(start + 1, end):
+            change = positions[i] - positions[i - 1]
+            if change < 0:
+                stats[g, 1] += 1
+                stats[g, 2] -= change
+                stats[g, 3] = max(stats[g, 3], -change)
+            elif change == 0:
+                stats[g, 4] += 1
+            elif change > 0:
+                stats[g, 5] += 1
+        
+        # Final third starts at the same lap index as slicing by int(laps * 0.67)
+        late_start = start + int((end - start) * 0.67)
+        stats[g, 6] = end - late_start
+        for i in range(late_start + 1, end):
+            if positions[i] - positions[i - 1] < 0:
+                stats[g, 7] += 1
+    
+    return stats
+
 class RacecraftCalculator(BaseDNACalculator):
     
     def __init__(self):
@@ -42,16 +79,18 @@ class RacecraftCalculator(BaseDNACalculator):
         if results.empty:
             return self._default_result(driver_id)
         
+        lap_stats = self._lap_stats_by_race(lap_times)
+        
         contributing_stats = {}
         component_scores = []
         
         # 1. Overtaking Quality (35% weight)
-        overtaking_quality = self._calculate_overtaking_quality(results, lap_times, all_results)
+        overtaking_quality = self._calculate_overtaking_quality(results, lap_stats, all_results)
         contributing_stats['overtaking_quality'] = overtaking_quality
         component_scores.append(('overtaking', overtaking_quality, 0.35))
         
         # 2. Defensive Driving (25% weight)
-        defensive_driving = self._calculate_defensive_driving(results, lap_times, all_results)
+        defensive_driving = self._calculate_defensive_driving(results, lap_stats, all_results)
         contributing_stats['defensive_driving'] = defensive_driving
         component_scores.append(('defensive', defensive_driving, 0.25))
         
@@ -61,7 +100,7 @@ class RacecraftCalculator(BaseDNACalculator):
         component_scores.append(('combat', combat_score, 0.25))
         
         # 4. Strategic Race Intelligence (15% weight)
-        strategic_intelligence = self._calculate_strategic_intelligence(results, qualifying, lap_times)
+        strategic_intelligence = self._calculate_strategic_intelligence(results, qualifying, lap_stats)
         contributing_stats['strategic_intelligence'] = strategic_intelligence
         component_scores.append(('strategic', strategic_intelligence, 0.15))
         
@@ -85,41 +124,28 @@ class RacecraftCalculator(BaseDNACalculator):
             'races_analyzed': len(results)
         }
     
-    def _calculate_overtaking_quality(self, results: pd.DataFrame, lap_times: pd.DataFrame, all_results: pd.DataFrame) -> float:
+    def _calculate_overtaking_quality(self, results: pd.DataFrame, lap_stats: Dict[Tuple[int, int], tuple], all_results: pd.DataFrame) -> float:
         """Calculate overtaking quality score"""
         try:
-            if lap_times.empty:
+            if not lap_stats:
                 return self._calculate_overtaking_fallback(results, all_results)
             
             overtaking_situations = []
             
             # Analyze each race for overtaking opportunities
-            for race_id in results['raceId'].unique():
-                race_results = results[results['raceId'] == race_id]
-                race_lap_times = lap_times[lap_times['raceId'] == race_id]
+            for race_key in self._race_driver_keys(results):
+                # Get driver's lap-by-lap position changes for this race
+                race_stats = lap_stats.get(race_key)
                 
-                if race_results.empty or race_lap_times.empty:
+                if race_stats is None or race_stats[0] < 5:  # Need minimum laps for analysis
                     continue
                 
-                # Get driver's lap-by-lap positions for this race
-                driver_laps = race_lap_times[race_lap_times['driverId'] == race_results['driverId'].iloc[0]]
+                # Overtaking laps are those where position improved
+                _, total_overtakes, positions_gained, max_position_gain = race_stats[:4]
                 
-                if len(driver_laps) < 5:  # Need minimum laps for analysis
-                    continue
-                
-                driver_laps = driver_laps.sort_values('lap')
-                
-                # Calculate position changes (negative = gained position)
-                position_changes = driver_laps['position'].diff()
-                
-                # Identify overtaking laps (position improved)
-                overtakes = position_changes[position_changes < 0]
-                
-                if len(overtakes) > 0:
+                if total_overtakes > 0:
                     # Calculate overtaking metrics for this race
-                    total_overtakes = len(overtakes)
-                    avg_positions_gained = abs(overtakes.mean())
-                    max_position_gain = abs(overtakes.min())
+                    avg_positions_gained = positions_gained / total_overtakes
                     
                     # Get track difficulty multiplier (simplified)
                     track_difficulty = 1.5  # Default moderate difficulty
@@ -178,40 +204,29 @@ class RacecraftCalculator(BaseDNACalculator):
             self.logger.warning(f"Overtaking fallback calculation failed: {e}")
             return 50.0
     
-    def _calculate_defensive_driving(self, results: pd.DataFrame, lap_times: pd.DataFrame, all_results: pd.DataFrame) -> float:
+    def _calculate_defensive_driving(self, results: pd.DataFrame, lap_stats: Dict[Tuple[int, int], tuple], all_results: pd.DataFrame) -> float:
         """Calculate defensive driving ability"""
         try:
-            if lap_times.empty:
+            if not lap_stats:
                 return self._calculate_defensive_fallback(results)
             
             defensive_situations = []
             
             # Analyze races for defensive situations
-            for race_id in results['raceId'].unique():
-                race_results = results[results['raceId'] == race_id]
-                race_lap_times = lap_times[lap_times['raceId'] == race_id]
+            for race_key in self._race_driver_keys(results):
+                # Get driver's position changes throughout race
+                race_stats = lap_stats.get(race_key)
                 
-                if race_results.empty or race_lap_times.empty:
+                if race_stats is None or race_stats[0] < 5:
                     continue
                 
-                # Get driver's positions throughout race
-                driver_laps = race_lap_times[race_lap_times['driverId'] == race_results['driverId'].iloc[0]]
-                
-                if len(driver_laps) < 5:
-                    continue
+                # Times position was held despite pressure, and times it was lost
+                total_laps = race_stats[0]
+                defensive_laps, pressure_situations = race_stats[4], race_stats[5]
                 
-                driver_laps = driver_laps.sort_values('lap')
-                
-                # Identify defensive situations (position under threat)
-                position_changes = driver_laps['position'].diff()
-                
-                # Count times position was held despite pressure
-                defensive_laps = position_changes[position_changes == 0]  # Position maintained
-                pressure_situations = len(position_changes[position_changes > 0])  # Times lost position
-                
-                if len(driver_laps) > 10:
-                    defensive_ratio = len(defensive_laps) / len(driver_laps)
-                    pressure_resistance = max(0, 1 - (pressure_situations / len(driver_laps)))
+                if total_laps > 10:
+                    defensive_ratio = defensive_laps / total_laps
+                    pressure_resistance = max(0, 1 - (pressure_situations / total_laps))
                     
                     race_defensive_score = (defensive_ratio * 50) + (pressure_resistance * 50)
                     defensive_situations.append(race_defensive_score)
@@ -289,7 +304,7 @@ class RacecraftCalculator(BaseDNACalculator):
             self.logger.warning(f"Wheel-to-wheel combat calculation failed: {e}")
             return 50.0
     
-    def _calculate_strategic_intelligence(self, results: pd.DataFrame, qualifying: pd.DataFrame, lap_times: pd.DataFrame) -> float:
+    def _calculate_strategic_intelligence(self, results: pd.DataFrame, qualifying: pd.DataFrame, lap_stats: Dict[Tuple[int, int], tuple]) -> float:
         """Calculate strategic race intelligence"""
         try:
             # This is simplified - ideal would analyze pit stop timing, DRS usage, etc.
@@ -314,25 +329,19 @@ class RacecraftCalculator(BaseDNACalculator):
                         strategic_scores.append(50 + (avg_improvement * 8) + (consistency * 20))
             
             # Analyze late-race performance (strategic timing)
-            if not lap_times.empty:
-                for race_id in results['raceId'].unique()[:10]:  # Sample races to avoid overprocessing
-                    race_lap_times = lap_times[lap_times['raceId'] == race_id]
-                    driver_laps = race_lap_times[race_lap_times['driverId'] == results['driverId'].iloc[0]]
+            if lap_stats:
+                driver_id = results['driverId'].iloc[0].item()
+                for race_id in results['raceId'].unique()[:10].tolist():  # Sample races to avoid overprocessing
+                    race_stats = lap_stats.get((race_id, driver_id))
                     
-                    if len(driver_laps) > 20:  # Need sufficient laps
-                        driver_laps = driver_laps.sort_values('lap')
-                        
+                    if race_stats is not None and race_stats[0] > 20:  # Need sufficient laps
                         # Analyze final third performance
-                        total_laps = len(driver_laps)
-                        final_third = driver_laps.iloc[int(total_laps * 0.67):]
+                        final_third_laps, strategic_moves = race_stats[6], race_stats[7]
                         
-                        if len(final_third) > 5:
-                            # Check for strategic late-race moves
-                            late_position_changes = final_third['position'].diff().dropna()
-                            strategic_moves = (late_position_changes < 0).sum()  # Position improvements
-                            
-                            if len(final_third) > 0:
-                                strategic_ratio = strategic_moves / len(final_third)
+                        if final_third_laps > 5:
+                            # Position improvements are strategic late-race moves
+                            if final_third_laps > 0:
+                                strategic_ratio = strategic_moves / final_third_laps
                                 strategic_scores.append(40 + (strategic_ratio * 60))
             
             if not strategic_scores:
@@ -344,6 +353,38 @@ class RacecraftCalculator(BaseDNACalculator):
             self.logger.warning(f"Strategic intelligence calculation failed: {e}")
             return 50.0
     
+    def _lap_stats_by_race(self, lap_times: pd.DataFrame) -> Dict[Tuple[int, int], tuple]:
+        """Compute lap position change stats per (raceId, driverId) in one compiled pass"""
+        if lap_times.empty:
+            return {}
+        
+        race_ids = lap_times['raceId'].to_numpy()
+        driver_ids = lap_times['driverId'].to_numpy()
+        positions = lap_times['position'].to_numpy(dtype=np.float64)
+        
+        # One sort up front groups each driver's race laps contiguously, ordered by lap
+        order = np.lexsort((lap_times['lap'].to_numpy(), driver_ids, race_ids))
+        race_ids, driver_ids, positions = race_ids[order], driver_ids[order], positions[order]
+        
+        boundaries = np.flatnonzero((np.diff(race_ids) != 0) | (np.diff(driver_ids) != 0)) + 1
+        starts = np.concatenate(([0], boundaries)).astype(np.int64)
+        ends = np.concatenate((boundaries, [len(positions)])).astype(np.int64)
+        
+        stats = _lap_position_stats(positions, starts, ends)
+        
+        # Counts come back as floats from the stats matrix; restore them to ints
+        return {
+            key: (int(laps), int(gains), gained, max_gain, int(held), int(lost), int(late_laps), int(late_gains))
+            for key, (laps, gains, gained, max_gain, held, lost, late_laps, late_gains) in zip(
+                zip(race_ids[starts].tolist(), driver_ids[starts].tolist()), stats.tolist()
+            )
+        }
+    
+    def _race_driver_keys(self, results: pd.DataFrame) -> List[Tuple[int, int]]:
+        """(raceId, driverId) of the first result row of each race, in race order"""
+        first_rows = results.drop_duplicates('raceId')
+        return list(zip(first_rows['raceId'].tolist(), first_rows['driverId'].tolist()))
+    
     def _convert_numpy_types(self, obj):
         """Convert numpy types to native Python types for JSON serialization."""
         if isinstance(obj, dict):
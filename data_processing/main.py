@@ -90,7 +90,7 @@ def calculate_timeline(args):
     try:
         from scripts.calculate_timeline import main as timeline_main
         
-        success = timeline_main(args.limit)
+        success = timeline_main(args.limit, args.workers, args.force)
         
         if success:
             logger.success("DNA timeline calculation completed successfully")
@@ -332,6 +332,10 @@ Examples:
     timeline_parser = subparsers.add_parser('timeline', help='Calculate driver DNA timeline data')
     timeline_parser.add_argument('--limit', type=int,
                                 help='Limit number of drivers to process')
+    timeline_parser.add_argument('--workers', type=int,
+                                help='Number of worker processes (default: CPU count)')
+    timeline_parser.add_argument('--force', action='store_true',
+                                help='Recalculate seasons that are already up to date')
     
     # Update command
     update_parser = subparsers.add_parser('update', help='Update specific driver DNA')
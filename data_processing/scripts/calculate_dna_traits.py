@@ -10,6 +10,7 @@ from tqdm import tqdm
 from loguru import logger
 from datetime import datetime
 import json
+from sqlalchemy import text
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
@@ -23,6 +24,43 @@ from calculators.pressure_calculator import PressureCalculator
 from calculators.racecraft_calculator import RacecraftCalculator
 # from calculators.clutch_calculator import ClutchCalculator
 
+# Statements are built once at import and reused for every driver
+UPSERT_PROFILE_SQL = text("""
+    INSERT INTO drivers_dna_profiles (
+        "driverId", "driverName", "aggressionScore", "pressurePerformanceScore",
+        "consistencyScore", "racecraftScore", "weatherMasteryScore", 
+        "clutchFactorScore", "raceStartScore", "racesAnalyzed", "careerSpan", "lastUpdated"
+    ) VALUES (
+        :driverId, :driverName, :aggressionScore, :pressurePerformanceScore,
+        :consistencyScore, :racecraftScore, :weatherMasteryScore,
+        :clutchFactorScore, :raceStartScore, :racesAnalyzed, :careerSpan, :lastUpdated
+    )
+    ON CONFLICT ("driverId") DO UPDATE SET
+        "driverName" = EXCLUDED."driverName",
+        "aggressionScore" = EXCLUDED."aggressionScore",
+        "pressurePerformanceScore" = EXCLUDED."pressurePerformanceScore",
+        "consistencyScore" = EXCLUDED."consistencyScore",
+        "racecraftScore" = EXCLUDED."racecraftScore",
+        "weatherMasteryScore" = EXCLUDED."weatherMasteryScore",
+        "clutchFactorScore" = EXCLUDED."clutchFactorScore",
+        "raceStartScore" = EXCLUDED."raceStartScore",
+        "racesAnalyzed" = EXCLUDED."racesAnalyzed",
+        "careerSpan" = EXCLUDED."careerSpan",
+        "lastUpdated" = EXCLUDED."lastUpdated"
+""")
+
+DELETE_BREAKDOWNS_SQL = text('DELETE FROM drivers_dna_breakdown WHERE "driverId" = :driverId')
+
+INSERT_BREAKDOWN_SQL = text("""
+    INSERT INTO drivers_dna_breakdown (
+        "driverId", "traitName", "rawValue", "normalizedScore",
+        "contributingStats", "calculationNotes"
+    ) VALUES (
+        :driverId, :traitName, :rawValue, :normalizedScore,
+        :contributingStats, :calculationNotes
+    )
+""")
+
 class DNAProcessor:
     """Processes F1 data to calculate driver DNA traits"""
     
@@ -63,17 +101,15 @@ class DNAProcessor:
                 self.data_cache[name] = pd.read_sql(query, engine)
                 self.logger.info(f"Loaded {len(self.data_cache[name]):,} rows from {name}")
             
-            # Merge race year data into results for era weighting
-            races_subset = self.data_cache['races'][['raceId', 'year', 'name', 'date']].copy()
-            self.data_cache['results'] = self.data_cache['results'].merge(
-                races_subset, on='raceId', how='left'
-            )
-            
-            # Also merge into qualifying
-            if 'qualifying' in self.data_cache:
-                self.data_cache['qualifying'] = self.data_cache['qualifying'].merge(
-                    races_subset, on='raceId', how='left'
-                )
+            # Broadcast race year data onto results (and qualifying) for era weighting.
+            # Mapping by raceId adds the columns in place instead of rebuilding the
+            # whole table the way a merge would.
+            races_by_id = self.data_cache['races'].set_index('raceId')[['year', 'name', 'date']]
+            for table in ('results', 'qualifying'):
+                if table in self.data_cache:
+                    race_ids = self.data_cache[table]['raceId']
+                    for col in races_by_id.columns:
+                        self.data_cache[table][col] = race_ids.map(races_by_id[col])
             
             self.logger.success("Successfully loaded all F1 data from database")
             return True
@@ -84,39 +120,40 @@ class DNAProcessor:
     
     def get_driver_data(self, driver_id: str) -> dict:
         """Get all relevant data for a specific driver"""
+        # Calculators only read these frames, and pandas 3 copy-on-write shields the cache from any writes
         driver_data = {}
         
         # Get driver's race results
         driver_data['results'] = self.data_cache['results'][
             self.data_cache['results']['driverId'] == driver_id
-        ].copy()
+        ]
         
         # Get driver's qualifying data
         if 'qualifying' in self.data_cache:
             driver_data['qualifying'] = self.data_cache['qualifying'][
                 self.data_cache['qualifying']['driverId'] == driver_id
-            ].copy()
+            ]
         
         # Get driver's lap times
         if 'lap_times' in self.data_cache:
             driver_data['lap_times'] = self.data_cache['lap_times'][
                 self.data_cache['lap_times']['driverId'] == driver_id
-            ].copy()
+            ]
         
         # Get driver's pit stops
         if 'pit_stops' in self.data_cache:
             driver_data['pit_stops'] = self.data_cache['pit_stops'][
                 self.data_cache['pit_stops']['driverId'] == driver_id
-            ].copy()
+            ]
         
         # Get driver's standings
         if 'driver_standings' in self.data_cache:
             driver_data['standings'] = self.data_cache['driver_standings'][
                 self.data_cache['driver_standings']['driverId'] == driver_id
-            ].copy()
+            ]
         
         # Include all results for teammate comparisons
-        driver_data['all_results'] = self.data_cache['results'].copy()
+        driver_data['all_results'] = self.data_cache['results']
         
         return driver_data
     
@@ -243,57 +280,22 @@ class DNAProcessor:
     def save_dna_results(self, dna_data: dict) -> bool:
         """Save DNA calculation results to database using UPSERT"""
         try:
-            from sqlalchemy import text
             engine = db_manager.connect()
             
             with engine.begin() as conn:
                 # UPSERT DNA profile using PostgreSQL ON CONFLICT
                 profile = self._convert_numpy_types(dna_data['profile'])
-                upsert_profile_sql = text("""
-                    INSERT INTO drivers_dna_profiles (
-                        "driverId", "driverName", "aggressionScore", "pressurePerformanceScore",
-                        "consistencyScore", "racecraftScore", "weatherMasteryScore", 
-                        "clutchFactorScore", "raceStartScore", "racesAnalyzed", "careerSpan", "lastUpdated"
-                    ) VALUES (
-                        :driverId, :driverName, :aggressionScore, :pressurePerformanceScore,
-                        :consistencyScore, :racecraftScore, :weatherMasteryScore,
-                        :clutchFactorScore, :raceStartScore, :racesAnalyzed, :careerSpan, :lastUpdated
-                    )
-                    ON CONFLICT ("driverId") DO UPDATE SET
-                        "driverName" = EXCLUDED."driverName",
-                        "aggressionScore" = EXCLUDED."aggressionScore",
-                        "pressurePerformanceScore" = EXCLUDED."pressurePerformanceScore",
-                        "consistencyScore" = EXCLUDED."consistencyScore",
-                        "racecraftScore" = EXCLUDED."racecraftScore",
-                        "weatherMasteryScore" = EXCLUDED."weatherMasteryScore",
-                        "clutchFactorScore" = EXCLUDED."clutchFactorScore",
-                        "raceStartScore" = EXCLUDED."raceStartScore",
-                        "racesAnalyzed" = EXCLUDED."racesAnalyzed",
-                        "careerSpan" = EXCLUDED."careerSpan",
-                        "lastUpdated" = EXCLUDED."lastUpdated"
-                """)
-                
-                conn.execute(upsert_profile_sql, profile)
+                conn.execute(UPSERT_PROFILE_SQL, profile)
                 
                 # Delete existing breakdowns for this driver and insert new ones
                 if dna_data['breakdowns']:
                     driver_id = profile['driverId']
-                    conn.execute(text('DELETE FROM drivers_dna_breakdown WHERE "driverId" = :driverId'), 
-                               {'driverId': driver_id})
+                    conn.execute(DELETE_BREAKDOWNS_SQL, {'driverId': driver_id})
                     
-                    # Insert new breakdowns
-                    for breakdown in dna_data['breakdowns']:
-                        breakdown = self._convert_numpy_types(breakdown)
-                        insert_breakdown_sql = text("""
-                            INSERT INTO drivers_dna_breakdown (
-                                "driverId", "traitName", "rawValue", "normalizedScore",
-                                "contributingStats", "calculationNotes"
-                            ) VALUES (
-                                :driverId, :traitName, :rawValue, :normalizedScore,
-                                :contributingStats, :calculationNotes
-                            )
-                        """)
-                        conn.execute(insert_breakdown_sql, breakdown)
+                    # Insert new breakdowns in a single executemany
+                    conn.execute(INSERT_BREAKDOWN_SQL, [
+                        self._convert_numpy_types(breakdown) for breakdown in dna_data['breakdowns']
+                    ])
             
             return True
             
@@ -313,7 +315,7 @@ class DNAProcessor:
         # Get driver info
         drivers_info = self.data_cache['drivers'][
             self.data_cache['drivers']['driverId'].isin(eligible_drivers)
-        ].copy()
+        ]
         
         drivers_list = []
         for _, driver in drivers_info.iterrows():
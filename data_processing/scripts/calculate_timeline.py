@@ -4,6 +4,7 @@ Calculate DNA Timeline - Season-by-season trait evolution
 """
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -11,8 +12,8 @@ from tqdm import tqdm
 from loguru import logger
 from datetime import datetime
 from typing import Dict, List, Optional
-import json
-from sqlalchemy import text
+import orjson
+from psycopg2.extras import execute_values
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
@@ -24,6 +25,60 @@ from calculators.race_start_calculator import RaceStartCalculator
 from calculators.pressure_calculator import PressureCalculator
 from calculators.racecraft_calculator import RacecraftCalculator
 
+# Columns the calculators actually use, per table loaded from the database
+TABLE_COLUMNS = {
+    'drivers': ['driverId', 'forename', 'surname'],
+    'results': ['raceId', 'driverId', 'constructorId', 'grid', 'position', 'positionOrder', 'points'],
+    'qualifying': ['raceId', 'driverId', 'position'],
+    'lap_times': ['raceId', 'driverId', 'lap', 'position'],
+    'driver_standings': ['raceId', 'driverId', 'position'],
+    'races': ['raceId', 'year', 'round'],
+}
+
+# Rows fetched per round trip when streaming tables from the database
+READ_CHUNK_ROWS = 100_000
+
+# Loaded tables are cached as Parquet, keyed on the latest raceId in the database
+TABLE_CACHE_DIR = Path(__file__).parent.parent / '.cache' / 'tables'
+
+# Tables sliced per (driver, season), mapped to their key in the calculators' input dict
+SEASON_TABLES = [
+    ('results', 'results'),
+    ('qualifying', 'qualifying'),
+    ('lap_times', 'lap_times'),
+    ('driver_standings', 'standings'),
+]
+
+_EMPTY_INDEX = np.array([], dtype=np.int64)
+
+# Number of drivers whose timeline rows are accumulated before writing to the database
+SAVE_BATCH_DRIVERS = 10
+
+UPSERT_TIMELINE_SQL = """
+    INSERT INTO drivers_dna_timeline (
+        "driverId", season, "traitScores", "racesCompleted"
+    ) VALUES %s
+    ON CONFLICT ("driverId", season) DO UPDATE SET
+        "traitScores" = EXCLUDED."traitScores",
+        "racesCompleted" = EXCLUDED."racesCompleted"
+"""
+
+# Processor holding the loaded F1 data inside each pool worker
+_worker_processor = None
+
+def _init_worker(processor: 'DNATimelineProcessor'):
+    """Install the loaded processor in a pool worker process"""
+    global _worker_processor
+    _worker_processor = processor
+
+def _process_driver_worker(driver: tuple) -> tuple:
+    """Calculate one driver's timeline in a pool worker"""
+    driver_id, driver_name, _ = driver
+    try:
+        return driver_id, driver_name, _worker_processor.process_driver_timeline(driver_id, driver_name), None
+    except Exception as e:
+        return driver_id, driver_name, [], str(e)
+
 class DNATimelineProcessor:
     """Calculate DNA traits for each driver by season"""
     
@@ -38,6 +93,10 @@ class DNATimelineProcessor:
             'racecraft': RacecraftCalculator()
         }
         self.data_cache = {}
+        self._season_idx = {}
+        self._races_idx = {}
+        self._driver_seasons = {}
+        self._existing_seasons = set()
     
     def load_f1_data(self) -> bool:
         """Load F1 data from database"""
@@ -45,25 +104,21 @@ class DNATimelineProcessor:
         engine = db_manager.connect()
         
         try:
-            # Load all necessary tables
-            tables_to_load = [
-                'drivers', 'results', 'qualifying', 'lap_times', 
-                'pit_stops', 'driver_standings', 'races', 'constructors'
-            ]
+            watermark = self._get_watermark(engine)
             
-            for table in tables_to_load:
+            # Load only the tables and columns the calculators need
+            for table, columns in TABLE_COLUMNS.items():
                 self.logger.info(f"Loading {table}...")
-                df = pd.read_sql(f'SELECT * FROM {table}', engine)
+                df = self._load_table(engine, table, columns, watermark)
                 self.data_cache[table] = df
                 self.logger.info(f"Loaded {len(df):,} rows from {table}")
             
-            # Add year column to results by joining with races
-            if 'results' in self.data_cache and 'races' in self.data_cache:
-                self.data_cache['results'] = self.data_cache['results'].merge(
-                    self.data_cache['races'][['raceId', 'year']],
-                    on='raceId',
-                    how='left'
-                )
+            # Add year column to the per-race tables by mapping raceId onto races
+            race_years = self.data_cache['races'].set_index('raceId')['year']
+            for table, _ in SEASON_TABLES:
+                self.data_cache[table]['year'] = self.data_cache[table]['raceId'].map(race_years)
+            
+            self._build_season_indices()
             
             self.logger.success("Successfully loaded all F1 data from database")
             return True
@@ -72,73 +127,117 @@ class DNATimelineProcessor:
             self.logger.error(f"Error loading F1 data: {e}")
             return False
     
+    def _get_watermark(self, engine) -> Optional[int]:
+        """Latest raceId in the database, used to tell whether cached tables are current"""
+        try:
+            watermark = pd.read_sql('SELECT MAX("raceId") AS watermark FROM races', engine)['watermark'].iloc[0]
+            return None if pd.isna(watermark) else int(watermark)
+        except Exception as e:
+            self.logger.warning(f"Could not read race watermark, bypassing table cache: {e}")
+            return None
+    
+    def _load_table(self, engine, table: str, columns: List[str], watermark: Optional[int]) -> pd.DataFrame:
+        """Load a table from the Parquet cache when it matches the watermark, otherwise from the database"""
+        if watermark is None:
+            return self._read_table(engine, table, columns)
+        
+        cache_path = TABLE_CACHE_DIR / f'{table}_{watermark}.parquet'
+        if cache_path.exists():
+            try:
+                return pd.read_parquet(cache_path, engine='pyarrow', columns=columns)
+            except Exception as e:
+                self.logger.warning(f"Ignoring unreadable cache for {table}: {e}")
+        
+        df = self._read_table(engine, table, columns)
+        
+        try:
+            TABLE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for stale_path in TABLE_CACHE_DIR.glob(f'{table}_*.parquet'):
+                stale_path.unlink()
+            df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+        except Exception as e:
+            self.logger.warning(f"Could not cache {table}: {e}")
+        
+        return df
+    
+    def _read_table(self, engine, table: str, columns: List[str]) -> pd.DataFrame:
+        """Stream a table in chunks, downcasting integer ID columns as each chunk arrives"""
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        chunks = pd.read_sql(f'SELECT {column_list} FROM {table}', engine, chunksize=READ_CHUNK_ROWS)
+        
+        downcast_chunks = []
+        for chunk in chunks:
+            for col in chunk.select_dtypes(include='integer').columns:
+                if col.endswith('Id'):
+                    chunk[col] = pd.to_numeric(chunk[col], downcast='integer')
+            downcast_chunks.append(chunk)
+        
+        if not downcast_chunks:
+            return pd.DataFrame(columns=columns)
+        
+        return pd.concat(downcast_chunks, ignore_index=True)
+    
     def get_driver_seasons(self, driver_id: int) -> List[int]:
         """Get list of seasons for a driver with sufficient races"""
         if 'results' not in self.data_cache:
             return []
         
-        driver_results = self.data_cache['results'][
-            self.data_cache['results']['driverId'] == driver_id
-        ]
-        
-        if driver_results.empty:
-            return []
+        return list(self._driver_seasons.get(driver_id, []))
+    
+    def get_existing_seasons(self) -> set:
+        """Fetch the (driverId, season, racesCompleted) keys already stored in the timeline table"""
+        try:
+            engine = db_manager.connect()
+            existing = pd.read_sql(
+                'SELECT "driverId", season, "racesCompleted" FROM drivers_dna_timeline', engine
+            )
+            return set(zip(
+                existing['driverId'].tolist(), existing['season'].tolist(), existing['racesCompleted'].tolist()
+            ))
+        except Exception as e:
+            self.logger.warning(f"Could not read existing timeline data, recalculating all seasons: {e}")
+            return set()
+    
+    def get_stale_seasons(self, driver_id: int) -> List[int]:
+        """Get the driver's qualifying seasons whose race count differs from the stored timeline"""
+        stale_seasons = []
+        for season in self.get_driver_seasons(driver_id):
+            races_completed = len(self._season_idx['results'].get((driver_id, season), _EMPTY_INDEX))
+            if (driver_id, season, races_completed) not in self._existing_seasons:
+                stale_seasons.append(season)
+        
+        return stale_seasons
+    
+    def _build_season_indices(self):
+        """Precompute row positions per (driverId, year) so season lookups avoid full-table scans"""
+        self._season_idx = {
+            table: self.data_cache[table].groupby(['driverId', 'year']).indices
+            for table, _ in SEASON_TABLES
+        }
+        self._races_idx = self.data_cache['races'].groupby('year').indices
         
-        # Count races per season
-        races_per_season = driver_results.groupby('year').size()
-        qualifying_seasons = races_per_season[
-            races_per_season >= self.min_races_per_season
-        ].index.tolist()
+        # Count races per season once for every driver instead of scanning results per driver
+        races_per_season = self.data_cache['results'].groupby(['driverId', 'year']).size()
+        qualifying_seasons = races_per_season[races_per_season >= self.min_races_per_season]
         
-        return sorted(qualifying_seasons)
+        self._driver_seasons = {}
+        for driver_id, season in qualifying_seasons.index.tolist():
+            self._driver_seasons.setdefault(driver_id, []).append(season)
     
     def get_driver_season_data(self, driver_id: int, season: int) -> Dict[str, pd.DataFrame]:
         """Get driver data for a specific season"""
         season_data = {}
+        key = (driver_id, season)
         
-        # Get results for this driver and season
-        if 'results' in self.data_cache:
-            season_results = self.data_cache['results'][
-                (self.data_cache['results']['driverId'] == driver_id) &
-                (self.data_cache['results']['year'] == season)
-            ]
-            season_data['results'] = season_results
-        
-        # Get qualifying data for this season
-        if 'qualifying' in self.data_cache and 'races' in self.data_cache:
-            # First get race IDs for this season
-            season_races = self.data_cache['races'][
-                self.data_cache['races']['year'] == season
-            ]['raceId'].tolist()
-            
-            season_qualifying = self.data_cache['qualifying'][
-                (self.data_cache['qualifying']['driverId'] == driver_id) &
-                (self.data_cache['qualifying']['raceId'].isin(season_races))
-            ]
-            season_data['qualifying'] = season_qualifying
-        
-        # Get lap times for this season
-        if 'lap_times' in self.data_cache:
-            season_lap_times = self.data_cache['lap_times'][
-                (self.data_cache['lap_times']['driverId'] == driver_id) &
-                (self.data_cache['lap_times']['raceId'].isin(season_races))
-            ] if 'season_races' in locals() else pd.DataFrame()
-            season_data['lap_times'] = season_lap_times
-        
-        # Get driver standings for this season
-        if 'driver_standings' in self.data_cache:
-            season_standings = self.data_cache['driver_standings'][
-                (self.data_cache['driver_standings']['driverId'] == driver_id) &
-                (self.data_cache['driver_standings']['raceId'].isin(season_races))
-            ] if 'season_races' in locals() else pd.DataFrame()
-            season_data['standings'] = season_standings
+        # Results, qualifying, lap times and standings for this driver and season
+        for table, data_key in SEASON_TABLES:
+            rows = self._season_idx[table].get(key, _EMPTY_INDEX)
+            season_data[data_key] = self.data_cache[table].take(rows)
         
         # Add races data for this season
-        if 'races' in self.data_cache and 'season_races' in locals():
-            season_race_data = self.data_cache['races'][
-                self.data_cache['races']['raceId'].isin(season_races)
-            ]
-            season_data['races'] = season_race_data
+        season_data['races'] = self.data_cache['races'].take(
+            self._races_idx.get(season, _EMPTY_INDEX)
+        )
         
         return season_data
     
@@ -159,7 +258,7 @@ class DNATimelineProcessor:
             try:
                 result = calculator.calculate_trait(str(driver_id), season_data)
                 score = result.get('score')
-                trait_scores[trait_name] = score if score is not None else None
+                trait_scores[trait_name] = float(score) if score is not None else None
                 self.logger.debug(f"{trait_name} for {driver_name} {season}: {score if score is not None else 'N/A'}")
             except Exception as e:
                 self.logger.debug(f"Error calculating {trait_name} for {driver_name} {season}: {e}")
@@ -168,7 +267,7 @@ class DNATimelineProcessor:
         return {
             'driverId': driver_id,
             'season': season,
-            'traitScores': json.dumps(trait_scores),
+            'traitScores': orjson.dumps(trait_scores).decode(),
             'racesCompleted': races_completed
         }
     
@@ -180,20 +279,15 @@ class DNATimelineProcessor:
         try:
             engine = db_manager.connect()
             
+            values = [
+                (int(data['driverId']), int(data['season']), data['traitScores'], int(data['racesCompleted']))
+                for data in timeline_data
+            ]
+            
+            # Send all rows as one multi-row UPSERT instead of a round trip per row
             with engine.begin() as conn:
-                for data in timeline_data:
-                    upsert_sql = text("""
-                        INSERT INTO drivers_dna_timeline (
-                            "driverId", season, "traitScores", "racesCompleted"
-                        ) VALUES (
-                            :driverId, :season, :traitScores, :racesCompleted
-                        )
-                        ON CONFLICT ("driverId", season) DO UPDATE SET
-                            "traitScores" = EXCLUDED."traitScores",
-                            "racesCompleted" = EXCLUDED."racesCompleted"
-                    """)
-                    
-                    conn.execute(upsert_sql, data)
+                with conn.connection.cursor() as cursor:
+                    execute_values(cursor, UPSERT_TIMELINE_SQL, values, page_size=500)
             
             self.logger.success(f"Successfully saved {len(timeline_data)} timeline records")
             return True
@@ -202,32 +296,29 @@ class DNATimelineProcessor:
             self.logger.error(f"Failed to save timeline data: {e}")
             return False
     
-    def process_driver_timeline(self, driver_id: int, driver_name: str) -> bool:
-        """Process timeline for a single driver"""
-        seasons = self.get_driver_seasons(driver_id)
+    def process_driver_timeline(self, driver_id: int, driver_name: str) -> List[Dict]:
+        """Calculate timeline records for a single driver"""
+        seasons = self.get_stale_seasons(driver_id)
         
         if not seasons:
-            self.logger.debug(f"No qualifying seasons for {driver_name}")
-            return False
+            self.logger.debug(f"No qualifying seasons to update for {driver_name}")
+            return []
         
         self.logger.info(f"Processing timeline for {driver_name} ({len(seasons)} seasons: {min(seasons)}-{max(seasons)})")
         
         timeline_data = []
         successful_seasons = 0
         
-        for season in tqdm(seasons, desc=f"Processing {driver_name}", leave=False):
+        for season in seasons:
             season_result = self.calculate_season_dna(driver_id, season, driver_name)
             if season_result:
                 timeline_data.append(season_result)
                 successful_seasons += 1
         
         if timeline_data:
-            success = self.save_timeline_data(timeline_data)
-            if success:
-                self.logger.info(f"Successfully processed {successful_seasons}/{len(seasons)} seasons for {driver_name}")
-                return True
+            self.logger.info(f"Successfully processed {successful_seasons}/{len(seasons)} seasons for {driver_name}")
         
-        return False
+        return timeline_data
     
     def get_eligible_drivers(self, limit: Optional[int] = None) -> List[tuple]:
         """Get list of drivers eligible for timeline analysis"""
@@ -235,62 +326,102 @@ class DNATimelineProcessor:
             return []
         
         # Get drivers with sufficient race data
-        driver_race_counts = self.data_cache['results'].groupby('driverId').size()
-        eligible_driver_ids = driver_race_counts[
+        driver_race_counts = self.data_cache['results'].groupby('driverId').size().rename('total_races')
+        eligible_counts = driver_race_counts[
             driver_race_counts >= (self.min_races_per_season * 2)  # At least 2 seasons worth
-        ].index.tolist()
+        ].reset_index()
         
-        # Get driver names
-        eligible_drivers = []
-        for driver_id in eligible_driver_ids:
-            driver_info = self.data_cache['drivers'][
-                self.data_cache['drivers']['driverId'] == driver_id
-            ]
-            if not driver_info.empty:
-                driver_name = f"{driver_info.iloc[0]['forename']} {driver_info.iloc[0]['surname']}"
-                total_races = driver_race_counts[driver_id]
-                eligible_drivers.append((driver_id, driver_name, total_races))
+        # Attach driver names in a single join
+        eligible = eligible_counts.merge(
+            self.data_cache['drivers'][['driverId', 'forename', 'surname']],
+            on='driverId'
+        )
+        eligible['name'] = eligible['forename'] + ' ' + eligible['surname']
         
         # Sort by total races (descending)
-        eligible_drivers.sort(key=lambda x: x[2], reverse=True)
+        eligible = eligible.sort_values('total_races', ascending=False, kind='stable')
         
         if limit:
-            eligible_drivers = eligible_drivers[:limit]
+            eligible = eligible.head(limit)
+        
+        eligible_drivers = list(zip(
+            eligible['driverId'].tolist(), eligible['name'].tolist(), eligible['total_races'].tolist()
+        ))
         
         return eligible_drivers
     
-    def process_all_timelines(self, limit: Optional[int] = None) -> bool:
-        """Process timelines for all eligible drivers"""
+    def process_all_timelines(self, limit: Optional[int] = None, max_workers: Optional[int] = None,
+                              force: bool = False) -> bool:
+        """Process timelines for all eligible drivers across a pool of worker processes"""
         eligible_drivers = self.get_eligible_drivers(limit)
         
         if not eligible_drivers:
             self.logger.warning("No eligible drivers found for timeline analysis")
             return False
         
+        # Seasons whose race count matches the stored row are skipped unless forced
+        self._existing_seasons = set() if force else self.get_existing_seasons()
+        stale_drivers = [driver for driver in eligible_drivers if self.get_stale_seasons(driver[0])]
+        
+        if len(stale_drivers) < len(eligible_drivers):
+            self.logger.info(f"Skipping {len(eligible_drivers) - len(stale_drivers)} drivers with up-to-date timelines")
+        
+        if not stale_drivers:
+            self.logger.success("All driver timelines are up to date")
+            return True
+        
+        eligible_drivers = stale_drivers
+        
         self.logger.info(f"Processing timeline data for {len(eligible_drivers)} drivers")
         
         successful_drivers = 0
         failed_drivers = 0
         
-        with tqdm(eligible_drivers, desc="Processing driver timelines") as pbar:
-            for driver_id, driver_name, total_races in pbar:
-                pbar.set_description(f"Processing {driver_name}")
-                
-                try:
-                    success = self.process_driver_timeline(driver_id, driver_name)
-                    if success:
-                        successful_drivers += 1
+        # Timeline rows are buffered and saved every SAVE_BATCH_DRIVERS drivers
+        pending_data = []
+        pending_drivers = 0
+        
+        def flush_pending():
+            nonlocal successful_drivers, failed_drivers, pending_data, pending_drivers
+            if self.save_timeline_data(pending_data):
+                successful_drivers += pending_drivers
+            else:
+                failed_drivers += pending_drivers
+            pending_data = []
+            pending_drivers = 0
+        
+        # Drivers are independent, so calculations run in parallel while the
+        # main process collects results and handles all database writes
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(self,)
+        ) as executor:
+            results = executor.map(_process_driver_worker, eligible_drivers, chunksize=4)
+            
+            with tqdm(results, total=len(eligible_drivers), desc="Processing driver timelines") as pbar:
+                for driver_id, driver_name, timeline_data, error in pbar:
+                    pbar.set_description(f"Processed {driver_name}")
+                    
+                    if error:
+                        self.logger.error(f"Failed to process {driver_name}: {error}")
+                        failed_drivers += 1
+                    elif timeline_data:
+                        pending_data.extend(timeline_data)
+                        pending_drivers += 1
                     else:
                         failed_drivers += 1
-                        
-                except Exception as e:
-                    self.logger.error(f"Failed to process {driver_name}: {e}")
-                    failed_drivers += 1
+                    
+                    if pending_drivers >= SAVE_BATCH_DRIVERS:
+                        flush_pending()
+        
+        if pending_drivers:
+            flush_pending()
         
         self.logger.success(f"Timeline processing completed: {successful_drivers} successful, {failed_drivers} failed")
         return successful_drivers > 0
 
-def main(limit: Optional[int] = None):
+def main(limit: Optional[int] = None, workers: Optional[int] = None, force: bool = False):
     """Main timeline calculation function"""
     processor = DNATimelineProcessor()
     
@@ -299,7 +430,7 @@ def main(limit: Optional[int] = None):
         return False
     
     # Process timelines
-    return processor.process_all_timelines(limit)
+    return processor.process_all_timelines(limit, max_workers=workers, force=force)
 
 if __name__ == "__main__":
     # Configure logging
@@ -313,11 +444,13 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Calculate DNA timeline data")
     parser.add_argument("--limit", type=int, help="Limit number of drivers to process")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Recalculate seasons that are already up to date")
     
     args = parser.parse_args()
     
     try:
-        success = main(args.limit)
+        success = main(args.limit, args.workers, args.force)
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         logger.warning("Timeline calculation cancelled by user")
@@ -4,10 +4,12 @@ Fetch Driver Images from Wikipedia
 """
 import sys
 import os
+import asyncio
 from pathlib import Path
 import pandas as pd
-import requests
-import time
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from aiolimiter import AsyncLimiter
 from tqdm import tqdm
 from loguru import logger
 from sqlalchemy import text
@@ -16,43 +18,112 @@ from sqlalchemy import text
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.database import db_manager
+from utils.wikipedia import (
+    MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUSES,
+    chunk_titles, page_images_url, page_title_from_url, parse_page_images
+)
+
+# Stay well within Wikipedia's API request budget
+MAX_CONCURRENT_REQUESTS = 16
+MAX_REQUESTS_PER_SECOND = 20
+
+# Wikipedia summaries are cached on disk so reruns skip the network
+CACHE_DIR = Path(__file__).parent.parent / '.cache'
+WIKI_CACHE_EXPIRY = 7 * 24 * 60 * 60  # 1 week
+
+UPDATE_IMAGE_URL_SQL = text("""
+    UPDATE drivers_dna_profiles 
+    SET "imageUrl" = :image_url 
+    WHERE "driverId" = :driver_id
+""")
 
 class DriverImageFetcher:
     
-    def __init__(self):
+    def __init__(self, concurrency: int = MAX_CONCURRENT_REQUESTS, 
+                 requests_per_second: int = MAX_REQUESTS_PER_SECOND):
         self.logger = logger
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.headers = {
             'User-Agent': 'RacingDecoded/1.0 (https://racing-decoded.com; contact@racing-decoded.com)'
-        })
+        }
     
-    def get_wikipedia_image_url(self, wikipedia_url: str) -> str:
-        """Extract image URL from Wikipedia page"""
+    async def get_wikipedia_image_urls(self, session: CachedSession, limiter: AsyncLimiter, 
+                                       titles: list) -> dict:
+        """Look up image URLs for a batch of Wikipedia page titles in a single request"""
         try:
-            # Extract page title from URL
-            page_title = wikipedia_url.split('/')[-1]
-            
-            # Use Wikipedia REST API
-            api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{page_title}"
+            api_url = page_images_url(titles)
             
-            response = self.session.get(api_url, timeout=10)
-            if response.status_code != 200:
-                return None
-            
-            data = response.json()
-            thumbnail = data.get('thumbnail', {}).get('source')
-            
-            if thumbnail:
-                # Get higher resolution by modifying the URL
-                # Wikipedia thumbnails can be resized
-                high_res = thumbnail.replace('/150px-', '/400px-').replace('/200px-', '/400px-')
-                return high_res
+            for attempt in range(MAX_RETRIES + 1):
+                # Only requests that actually reach Wikipedia count against the rate limit
+                if not await session.cache.has_url(api_url):
+                    await limiter.acquire()
+                
+                async with session.get(api_url) as response:
+                    if response.status == 200:
+                        return parse_page_images(await response.json(), titles)
+                    
+                    if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                        return {}
+                    
+                    delay = self._retry_delay(response.headers.get('Retry-After'), attempt)
+                
+                self.logger.debug(f"Wikipedia returned {response.status}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
             
-            return None
+            return {}
             
         except Exception as e:
-            self.logger.debug(f"Error fetching image for {wikipedia_url}: {e}")
-            return None
+            self.logger.debug(f"Error fetching images for {len(titles)} pages: {e}")
+            return {}
+    
+    def _retry_delay(self, retry_after: str, attempt: int) -> float:
+        """Seconds to wait before a retry, preferring the server's Retry-After header"""
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return RETRY_BACKOFF_FACTOR * (2 ** attempt)
+    
+    async def fetch_image_urls(self, drivers: list) -> list:
+        """Fetch image URLs for (driver_id, driver_name, wikipedia_url) tuples in batched requests"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = AsyncLimiter(self.requests_per_second, 1)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Separate from the requests_cache file of fetch_driver_images_simple.py, whose entries are serialized differently
+        cache = SQLiteBackend(str(CACHE_DIR / 'wiki_images_aiohttp.sqlite'), expire_after=WIKI_CACHE_EXPIRY)
+        
+        titles = list(dict.fromkeys(page_title_from_url(url) for _, _, url in drivers))
+        batches = list(chunk_titles(titles))
+        
+        async with CachedSession(cache=cache, headers=self.headers, connector=connector, timeout=timeout) as session:
+            with tqdm(total=len(batches), desc="Fetching images") as pbar:
+                
+                async def _bounded(batch):
+                    async with semaphore:
+                        batch_images = await self.get_wikipedia_image_urls(session, limiter, batch)
+                    
+                    pbar.update(1)
+                    return batch_images
+                
+                results = await asyncio.gather(*[_bounded(batch) for batch in batches])
+        
+        images_by_title = {}
+        for batch_images in results:
+            images_by_title.update(batch_images)
+        
+        image_urls = []
+        for driver_id, driver_name, wikipedia_url in drivers:
+            image_url = images_by_title.get(page_title_from_url(wikipedia_url))
+            
+            if image_url:
+                self.logger.debug(f"Found image for {driver_name}: {image_url}")
+                image_urls.append((driver_id, image_url))
+            else:
+                self.logger.debug(f"No image found for {driver_name}")
+        
+        return image_urls
     
     def update_driver_images(self, limit: int = None) -> bool:
         """Fetch and store image URLs for drivers"""
@@ -90,39 +161,23 @@ class DriverImageFetcher:
                 
             self.logger.info(f"Fetching image URLs for {len(df)} drivers")
             
-            successful_updates = 0
+            drivers = list(zip(
+                df['driverId'].tolist(),
+                (df['forename'] + ' ' + df['surname']).tolist(),
+                df['url'].tolist()
+            ))
             
-            with tqdm(df.iterrows(), total=len(df), desc="Fetching images") as pbar:
-                for _, row in pbar:
-                    driver_id = row['driverId']
-                    driver_name = f"{row['forename']} {row['surname']}"
-                    wikipedia_url = row['url']
-                    
-                    pbar.set_description(f"Fetching {driver_name}")
-                    
-                    # Get image URL from Wikipedia
-                    image_url = self.get_wikipedia_image_url(wikipedia_url)
-                    
-                    if image_url:
-                        # Update database
-                        with engine.begin() as conn:
-                            update_sql = text("""
-                                UPDATE drivers_dna_profiles 
-                                SET "imageUrl" = :image_url 
-                                WHERE "driverId" = :driver_id
-                            """)
-                            conn.execute(update_sql, 
-                                {'image_url': image_url, 'driver_id': driver_id}
-                            )
-                        
-                        successful_updates += 1
-                        self.logger.debug(f"Updated {driver_name}: {image_url}")
-                    else:
-                        self.logger.debug(f"No image found for {driver_name}")
-                    
-                    # Be respectful to Wikipedia's servers
-                    time.sleep(0.5)
+            image_urls = asyncio.run(self.fetch_image_urls(drivers))
+            
+            # Write all found image URLs in a single transaction
+            if image_urls:
+                with engine.begin() as conn:
+                    conn.execute(UPDATE_IMAGE_URL_SQL, [
+                        {'image_url': image_url, 'driver_id': driver_id}
+                        for driver_id, image_url in image_urls
+                    ])
             
+            successful_updates = len(image_urls)
             self.logger.success(f"Successfully updated {successful_updates}/{len(df)} driver images")
             return True
             
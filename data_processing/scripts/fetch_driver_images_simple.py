@@ -5,8 +5,9 @@ Fetch Driver Images from Wikipedia - Simplified Version
 import sys
 import os
 from pathlib import Path
-import requests
-import time
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from loguru import logger
 from sqlalchemy import text
 import json
@@ -15,38 +16,63 @@ import json
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.database import db_manager
+from utils.wikipedia import (
+    MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUSES,
+    chunk_titles, page_images_url, page_title_from_url, parse_page_images
+)
 
-def get_wikipedia_image_url(wikipedia_url: str) -> str:
-    """Extract image URL from Wikipedia page"""
-    try:
-        # Extract page title from URL
-        page_title = wikipedia_url.split('/')[-1]
-        
-        # Use Wikipedia REST API
-        api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{page_title}"
-        
-        headers = {
-            'User-Agent': 'RacingDecoded/1.0 (https://racing-decoded.com)'
-        }
-        
-        response = requests.get(api_url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            logger.debug(f"Failed to fetch {api_url}: {response.status_code}")
-            return None
-        
-        data = response.json()
-        thumbnail = data.get('thumbnail', {}).get('source')
-        
-        if thumbnail:
-            # Get higher resolution by modifying the URL
-            high_res = thumbnail.replace('/150px-', '/400px-').replace('/200px-', '/400px-')
-            return high_res
-        
-        return None
+# Wikipedia summaries are cached on disk so reruns skip the network
+CACHE_DIR = Path(__file__).parent.parent / '.cache'
+WIKI_CACHE_EXPIRY = 7 * 24 * 60 * 60  # 1 week
+
+# Separate from the aiohttp cache file of fetch_driver_images.py, whose entries are serialized differently
+session = requests_cache.CachedSession(
+    str(CACHE_DIR / 'wiki_images_requests.sqlite'),
+    backend='sqlite',
+    expire_after=WIKI_CACHE_EXPIRY,
+    stale_if_error=True
+)
+session.headers.update({
+    'User-Agent': 'RacingDecoded/1.0 (https://racing-decoded.com)'
+})
+
+# Keep connections alive between batches and back off (honoring Retry-After) when throttled
+session.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True
+    )
+))
+
+def get_wikipedia_image_urls(wikipedia_urls: list) -> dict:
+    """Look up image URLs for Wikipedia pages, batching titles into as few requests as possible"""
+    titles = [page_title_from_url(url) for url in wikipedia_urls]
+    images_by_title = {}
+    
+    for batch in chunk_titles(list(dict.fromkeys(titles))):
+        api_url = page_images_url(batch)
         
-    except Exception as e:
-        logger.debug(f"Error fetching image for {wikipedia_url}: {e}")
-        return None
+        try:
+            response = session.get(api_url, timeout=10)
+            
+            if response.status_code != 200:
+                logger.debug(f"Failed to fetch {api_url}: {response.status_code}")
+                continue
+            
+            images_by_title.update(parse_page_images(response.json(), batch))
+            
+        except Exception as e:
+            logger.debug(f"Error fetching images for {len(batch)} pages: {e}")
+    
+    return {
+        url: images_by_title[title]
+        for url, title in zip(wikipedia_urls, titles)
+        if title in images_by_title
+    }
 
 def main():
     engine = db_manager.connect()
@@ -71,35 +97,30 @@ def main():
         return
     
     logger.info(f"Fetching image URLs for {len(drivers)} drivers")
-    successful_updates = 0
+    image_urls = get_wikipedia_image_urls([driver[3] for driver in drivers])
+    updates = []
     
     for driver in drivers:
         driver_id = driver[0]
         driver_name = f"{driver[1]} {driver[2]}"
-        wikipedia_url = driver[3]
-        
-        logger.info(f"Processing {driver_name}")
-        
-        # Get image URL from Wikipedia
-        image_url = get_wikipedia_image_url(wikipedia_url)
+        image_url = image_urls.get(driver[3])
         
         if image_url:
-            # Update database
-            with engine.begin() as conn:
-                conn.execute(text("""
-                    UPDATE drivers_dna_profiles 
-                    SET "imageUrl" = :image_url 
-                    WHERE "driverId" = :driver_id
-                """), {'image_url': image_url, 'driver_id': driver_id})
-            
-            successful_updates += 1
-            logger.success(f"Updated {driver_name}: {image_url}")
+            updates.append({'image_url': image_url, 'driver_id': driver_id})
+            logger.success(f"Found {driver_name}: {image_url}")
         else:
             logger.warning(f"No image found for {driver_name}")
-        
-        # Be respectful to Wikipedia's servers
-        time.sleep(1)
     
+    # Update database in a single transaction
+    if updates:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE drivers_dna_profiles 
+                SET "imageUrl" = :image_url 
+                WHERE "driverId" = :driver_id
+            """), updates)
+    
+    successful_updates = len(updates)
     logger.success(f"Successfully updated {successful_updates}/{len(drivers)} driver images")
 
 if __name__ == "__main__":
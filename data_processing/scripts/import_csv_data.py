@@ -4,7 +4,9 @@ Import F1 CSV data into PostgreSQL database
 """
 import sys
 import os
+import io
 from pathlib import Path
+from typing import Iterable, Union
 import pandas as pd
 from tqdm import tqdm
 from loguru import logger
@@ -16,31 +18,41 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.database import db_manager
 from utils.data_loader import F1DataLoader
 
+# Rows serialized into each COPY round trip
+COPY_CHUNK_ROWS = 50_000
+
+# Memory available to rebuild secondary indexes once a table is loaded
+IMPORT_MAINTENANCE_WORK_MEM = '1GB'
+
+# Indexes that do not back a primary key or other constraint, so they can be dropped while loading
+SECONDARY_INDEXES_SQL = """
+    SELECT quote_ident(n.nspname) || '.' || quote_ident(ic.relname), pg_get_indexdef(ix.indexrelid)
+    FROM pg_index ix
+    JOIN pg_class ic ON ic.oid = ix.indexrelid
+    JOIN pg_namespace n ON n.oid = ic.relnamespace
+    WHERE ix.indrelid = to_regclass(%s)
+    AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+"""
+
 def clean_data_for_db(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
-    """Clean DataFrame for database insertion"""
-    df_clean = df.copy()
+    """Clean DataFrame for database insertion, converting columns in place"""
+    # Missing values need no replacement: COPY writes NaN, NaT and None as NULL
     
-    # Replace NaN with None for proper NULL insertion
-    df_clean = df_clean.replace({pd.NaT: None, pd.NA: None})
-    df_clean = df_clean.where(pd.notna(df_clean), None)
+    # Nullable integer columns are read as floats; write them as integers so COPY accepts "1" rather than "1.0"
+    for col in df.select_dtypes(include=['float']).columns:
+        values = df[col].dropna()
+        if (values == values.round()).all():
+            df[col] = df[col].astype('Int64')
     
     # Convert boolean columns to proper format
-    bool_cols = df_clean.select_dtypes(include=['bool']).columns
-    for col in bool_cols:
-        df_clean[col] = df_clean[col].astype('boolean')
-    
-    # Handle string columns carefully - don't convert None to string
-    str_cols = df_clean.select_dtypes(include=['object']).columns
-    for col in str_cols:
-        if df_clean[col].dtype == 'object':
-            # Only process non-null values to avoid converting None to "None"
-            mask = df_clean[col].notna()
-            if mask.any():
-                df_clean.loc[mask, col] = df_clean.loc[mask, col].astype(str).str.strip()
-                # Replace "nan" strings with None, but preserve actual None values
-                df_clean.loc[mask, col] = df_clean.loc[mask, col].replace('nan', None)
-    
-    return df_clean
+    for col in df.select_dtypes(include=['bool']).columns:
+        df[col] = df[col].astype('boolean')
+    
+    # Strip string columns in Arrow-backed storage, which trims in C++ and keeps nulls as nulls
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        df[col] = df[col].astype('str').str.strip()
+    
+    return df
 
 def create_table_mappings():
     """Define CSV to database table mappings"""
@@ -61,36 +73,66 @@ def create_table_mappings():
         'sprint_results': 'sprint_results'
     }
 
-def import_csv_to_db(csv_name: str, df: pd.DataFrame, table_name: str, 
-                    batch_size: int = 1000) -> None:
-    """Import a single CSV DataFrame to database table"""
-    logger.info(f"Importing {csv_name} to {table_name} ({len(df)} rows)")
+def drop_secondary_indexes(cursor, table_name: str) -> list:
+    """Drop a table's non-constraint indexes, returning their definitions for recreation"""
+    cursor.execute(SECONDARY_INDEXES_SQL, (f'"{table_name}"',))
+    indexes = cursor.fetchall()
+    
+    for index_name, _ in indexes:
+        cursor.execute(f"DROP INDEX {index_name}")
+    
+    return [index_def for _, index_def in indexes]
+
+def import_csv_to_db(csv_name: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, 
+                    batch_size: int = COPY_CHUNK_ROWS) -> int:
+    """Import a CSV DataFrame, or a stream of its chunks, to a database table using COPY"""
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    total_rows = len(data) if isinstance(data, pd.DataFrame) else None
+    logger.info(f"Importing {csv_name} to {table_name}" + (f" ({total_rows} rows)" if total_rows is not None else ""))
     
     try:
-        # Clean data
-        df_clean = clean_data_for_db(df, table_name)
+        # Stream each chunk through one reusable CSV buffer, batch_size rows per COPY
+        buffer = io.StringIO()
+        rows_imported = 0
+        raw_conn = db_manager.connect().raw_connection()
         
-        # Import in batches to avoid memory issues
-        total_batches = (len(df_clean) + batch_size - 1) // batch_size
-        
-        with tqdm(total=total_batches, desc=f"Importing {csv_name}") as pbar:
-            for i in range(0, len(df_clean), batch_size):
-                batch = df_clean.iloc[i:i + batch_size]
-                batch_data = batch.to_dict('records')
+        try:
+            with raw_conn.cursor() as cursor:
+                # Loading is one transaction, so commit without waiting on WAL flush and
+                # build secondary indexes once at the end rather than row by row
+                cursor.execute("SET LOCAL synchronous_commit = off")
+                cursor.execute(f"SET LOCAL maintenance_work_mem = '{IMPORT_MAINTENANCE_WORK_MEM}'")
+                index_defs = drop_secondary_indexes(cursor, table_name)
                 
-                # Use pandas to_sql for efficient insertion
-                engine = db_manager.connect()
-                batch.to_sql(
-                    name=table_name,
-                    con=engine,
-                    if_exists='append',
-                    index=False,
-                    method='multi'
-                )
+                with tqdm(total=total_rows, unit='rows', desc=f"Importing {csv_name}") as pbar:
+                    for chunk in chunks:
+                        chunk_clean = clean_data_for_db(chunk, table_name)
+                        columns = ', '.join(f'"{col}"' for col in chunk_clean.columns)
+                        copy_sql = f"COPY \"{table_name}\" ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+                        
+                        for i in range(0, len(chunk_clean), batch_size):
+                            batch = chunk_clean.iloc[i:i + batch_size]
+                            buffer.seek(0)
+                            buffer.truncate()
+                            batch.to_csv(buffer, index=False, header=False, na_rep='\\N')
+                            buffer.seek(0)
+                            
+                            cursor.copy_expert(copy_sql, buffer)
+                            rows_imported += len(batch)
+                            pbar.update(len(batch))
                 
-                pbar.update(1)
+                for index_def in index_defs:
+                    cursor.execute(index_def)
+            
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
         
-        logger.success(f"Successfully imported {len(df_clean)} rows to {table_name}")
+        logger.success(f"Successfully imported {rows_imported} rows to {table_name}")
+        return rows_imported
         
     except Exception as e:
         logger.error(f"Failed to import {csv_name} to {table_name}: {e}")
@@ -141,20 +183,19 @@ def main():
     # Initialize data loader
     data_loader = F1DataLoader()
     
-    # Load all CSV files
-    logger.info("Loading CSV files...")
-    csv_data = data_loader.load_all_csvs()
+    # Import data in dependency order
+    import_order = [
+        'seasons', 'circuits', 'constructors', 'drivers', 
+        'races', 'status', 'results', 'qualifying',
+        'lap_times', 'pit_stops', 'driver_standings',
+        'constructor_results', 'constructor_standings', 'sprint_results'
+    ]
     
-    if not csv_data:
-        logger.error("No CSV data loaded. Exiting.")
+    available = [name for name in import_order if (data_loader.data_dir / f"{name}.csv").exists()]
+    if not available:
+        logger.error("No CSV data found. Exiting.")
         return False
     
-    # Print data summary
-    summary = data_loader.get_data_summary(csv_data)
-    logger.info("Data Summary:")
-    for name, stats in summary.items():
-        logger.info(f"  {name}: {stats['rows']:,} rows, {stats['columns']} columns")
-    
     # Get table mappings
     table_mappings = create_table_mappings()
     
@@ -162,29 +203,21 @@ def main():
     logger.info("Truncating existing tables...")
     truncate_tables(table_mappings)
     
-    # Import data in dependency order
-    import_order = [
-        'seasons', 'circuits', 'constructors', 'drivers', 
-        'races', 'status', 'results', 'qualifying',
-        'lap_times', 'pit_stops', 'driver_standings',
-        'constructor_results', 'constructor_standings', 'sprint_results'
-    ]
-    
     success_count = 0
     total_rows_imported = 0
     
     for csv_name in import_order:
-        if csv_name not in csv_data:
+        if csv_name not in available:
             logger.warning(f"Skipping missing CSV: {csv_name}")
             continue
         
         table_name = table_mappings[csv_name]
-        df = csv_data[csv_name]
         
         try:
-            import_csv_to_db(csv_name, df, table_name)
+            # Stream the file straight into COPY so peak memory is one chunk, not the whole file
+            chunks = data_loader.load_csv_iter(csv_name)
+            total_rows_imported += import_csv_to_db(csv_name, chunks, table_name)
             success_count += 1
-            total_rows_imported += len(df)
         except Exception as e:
             logger.error(f"Failed to import {csv_name}: {e}")
             continue
@@ -192,7 +225,7 @@ def main():
     logger.success(f"Import completed: {success_count}/{len(import_order)} tables imported")
     logger.success(f"Total rows imported: {total_rows_imported:,}")
     
-    return success_count == len([name for name in import_order if name in csv_data])
+    return success_count == len(available)
 
 if __name__ == "__main__":
     # Configure logging
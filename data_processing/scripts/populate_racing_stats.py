@@ -13,6 +13,73 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.database import db_manager
 
+# Race and final-championship statistics for every driver with a DNA profile
+POPULATE_RACING_STATS_SQL = text("""
+    WITH race_stats AS (
+        SELECT 
+            r."driverId",
+            COUNT(*) as total_races,
+            SUM(CASE WHEN position = 1 THEN 1 ELSE 0 END) as wins,
+            SUM(CASE WHEN position = 2 THEN 1 ELSE 0 END) as second_places,
+            SUM(CASE WHEN position = 3 THEN 1 ELSE 0 END) as third_places,
+            SUM(CASE WHEN position IN (1,2,3) THEN 1 ELSE 0 END) as podiums,
+            AVG(position::decimal) as avg_finish_position
+        FROM results r
+        WHERE r.position IS NOT NULL
+        GROUP BY r."driverId"
+    ),
+    final_standings AS (
+        SELECT 
+            ds."driverId",
+            ds.position as final_position,
+            ROW_NUMBER() OVER (PARTITION BY ds."driverId", r.year ORDER BY r."raceId" DESC) as rn
+        FROM driver_standings ds
+        JOIN races r ON ds."raceId" = r."raceId"
+    ),
+    championship_stats AS (
+        SELECT 
+            "driverId",
+            MIN(final_position) as best_championship_finish,
+            AVG(final_position::decimal) as avg_championship_finish,
+            COUNT(*) as seasons_completed
+        FROM final_standings
+        WHERE rn = 1
+        GROUP BY "driverId"
+    )
+    INSERT INTO driver_racing_stats (
+        "driverId", "totalRaces", wins, "secondPlaces", "thirdPlaces", 
+        podiums, "avgFinishPosition", "bestChampionshipFinish", 
+        "avgChampionshipFinish", "seasonsCompleted", "lastUpdated"
+    )
+    SELECT 
+        d."driverId",
+        COALESCE(rs.total_races, 0),
+        COALESCE(rs.wins, 0),
+        COALESCE(rs.second_places, 0),
+        COALESCE(rs.third_places, 0),
+        COALESCE(rs.podiums, 0),
+        rs.avg_finish_position,
+        cs.best_championship_finish,
+        cs.avg_championship_finish,
+        COALESCE(cs.seasons_completed, 0),
+        :last_updated
+    FROM drivers d
+    JOIN drivers_dna_profiles ddp ON d."driverId" = ddp."driverId"
+    LEFT JOIN race_stats rs ON rs."driverId" = d."driverId"
+    LEFT JOIN championship_stats cs ON cs."driverId" = d."driverId"
+    ON CONFLICT ("driverId") DO UPDATE SET
+        "totalRaces" = EXCLUDED."totalRaces",
+        wins = EXCLUDED.wins,
+        "secondPlaces" = EXCLUDED."secondPlaces", 
+        "thirdPlaces" = EXCLUDED."thirdPlaces",
+        podiums = EXCLUDED.podiums,
+        "avgFinishPosition" = EXCLUDED."avgFinishPosition",
+        "bestChampionshipFinish" = EXCLUDED."bestChampionshipFinish",
+        "avgChampionshipFinish" = EXCLUDED."avgChampionshipFinish",
+        "seasonsCompleted" = EXCLUDED."seasonsCompleted",
+        "lastUpdated" = EXCLUDED."lastUpdated"
+""")
+
 def calculate_and_populate_racing_stats():
     """Calculate racing statistics from source tables and populate the new table"""
     engine = db_manager.connect()
@@ -38,105 +105,11 @@ def calculate_and_populate_racing_stats():
                 FOREIGN KEY ("driverId") REFERENCES drivers("driverId")
             )
         """))
-    
-    # Get all drivers with DNA profiles
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT d."driverId", d.forename, d.surname 
-            FROM drivers d
-            JOIN drivers_dna_profiles ddp ON d."driverId" = ddp."driverId"
-            ORDER BY ddp."racesAnalyzed" DESC
-        """))
         
-        drivers = result.fetchall()
-    
-    logger.info(f"Calculating racing statistics for {len(drivers)} drivers")
+        # Aggregate every driver with a DNA profile in one set-based UPSERT
+        result = conn.execute(POPULATE_RACING_STATS_SQL, {'last_updated': datetime.now()})
     
-    for driver_id, forename, surname in drivers:
-        driver_name = f"{forename} {surname}"
-        
-        # Calculate racing statistics
-        with engine.connect() as conn:
-            # Race statistics
-            race_result = conn.execute(text("""
-                SELECT 
-                    COUNT(*) as total_races,
-                    SUM(CASE WHEN position = 1 THEN 1 ELSE 0 END) as wins,
-                    SUM(CASE WHEN position = 2 THEN 1 ELSE 0 END) as second_places,
-                    SUM(CASE WHEN position = 3 THEN 1 ELSE 0 END) as third_places,
-                    SUM(CASE WHEN position IN (1,2,3) THEN 1 ELSE 0 END) as podiums,
-                    AVG(CASE WHEN position IS NOT NULL THEN position::decimal END) as avg_finish_position
-                FROM results r
-                WHERE r."driverId" = :driver_id
-                AND r.position IS NOT NULL
-            """), {'driver_id': driver_id})
-            
-            race_stats = race_result.fetchone()
-            
-            # Championship statistics
-            championship_result = conn.execute(text("""
-                WITH final_standings AS (
-                    SELECT 
-                        r.year,
-                        ds.position as final_position,
-                        ROW_NUMBER() OVER (PARTITION BY r.year ORDER BY r."raceId" DESC) as rn
-                    FROM driver_standings ds
-                    JOIN races r ON ds."raceId" = r."raceId"
-                    WHERE ds."driverId" = :driver_id
-                )
-                SELECT 
-                    MIN(final_position) as best_championship_finish,
-                    AVG(final_position::decimal) as avg_championship_finish,
-                    COUNT(*) as seasons_completed
-                FROM final_standings
-                WHERE rn = 1
-            """), {'driver_id': driver_id})
-            
-            championship_stats = championship_result.fetchone()
-        
-        # Prepare the statistics - handle null values properly
-        stats = {
-            'driver_id': driver_id,
-            'total_races': int(race_stats[0]) if race_stats and race_stats[0] else 0,
-            'wins': int(race_stats[1]) if race_stats and race_stats[1] else 0,
-            'second_places': int(race_stats[2]) if race_stats and race_stats[2] else 0,
-            'third_places': int(race_stats[3]) if race_stats and race_stats[3] else 0,
-            'podiums': int(race_stats[4]) if race_stats and race_stats[4] else 0,
-            'avg_finish_position': float(race_stats[5]) if race_stats and race_stats[5] else None,
-            'best_championship_finish': int(championship_stats[0]) if championship_stats and championship_stats[0] else None,
-            'avg_championship_finish': float(championship_stats[1]) if championship_stats and championship_stats[1] else None,
-            'seasons_completed': int(championship_stats[2]) if championship_stats and championship_stats[2] else 0
-        }
-        
-        # Insert or update the racing stats
-        with engine.begin() as conn:
-            conn.execute(text("""
-                INSERT INTO driver_racing_stats (
-                    "driverId", "totalRaces", wins, "secondPlaces", "thirdPlaces", 
-                    podiums, "avgFinishPosition", "bestChampionshipFinish", 
-                    "avgChampionshipFinish", "seasonsCompleted", "lastUpdated"
-                ) VALUES (
-                    :driver_id, :total_races, :wins, :second_places, :third_places,
-                    :podiums, :avg_finish_position, :best_championship_finish,
-                    :avg_championship_finish, :seasons_completed, :last_updated
-                )
-                ON CONFLICT ("driverId") DO UPDATE SET
-                    "totalRaces" = EXCLUDED."totalRaces",
-                    wins = EXCLUDED.wins,
-                    "secondPlaces" = EXCLUDED."secondPlaces", 
-                    "thirdPlaces" = EXCLUDED."thirdPlaces",
-                    podiums = EXCLUDED.podiums,
-                    "avgFinishPosition" = EXCLUDED."avgFinishPosition",
-                    "bestChampionshipFinish" = EXCLUDED."bestChampionshipFinish",
-                    "avgChampionshipFinish" = EXCLUDED."avgChampionshipFinish",
-                    "seasonsCompleted" = EXCLUDED."seasonsCompleted",
-                    "lastUpdated" = EXCLUDED."lastUpdated"
-            """), {
-                **stats,
-                'last_updated': datetime.now()
-            })
-        
-        logger.info(f"Updated {driver_name}: {stats['wins']} wins, {stats['podiums']} podiums")
+    logger.info(f"Updated racing statistics for {result.rowcount} drivers")
 
 if __name__ == "__main__":
     logger.remove()
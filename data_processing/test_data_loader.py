@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test that both CSV loaders coerce malformed numeric values to nulls
+"""
+import sys
+import tempfile
+from pathlib import Path
+import pandas as pd
+from loguru import logger
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent))
+
+from utils.data_loader import F1DataLoader
+
+RESULTS_CSV = """resultId,raceId,driverId,constructorId,grid,position,positionText,positionOrder,points,laps,milliseconds
+1,1,1,1,1,1,1,1,25,58,5690616
+2,1,2,2,2,R,R,2,0,40,\\N
+3,1,3,3,3,3,3,3,15,58,abc
+"""
+
+def test_malformed_numeric_values():
+    """A non-numeric cell in a numeric column becomes null in both load_csv and load_csv_iter"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        (Path(data_dir) / 'results.csv').write_text(RESULTS_CSV)
+        loader = F1DataLoader(data_dir)
+        
+        loaded = loader.load_csv('results')
+        streamed = pd.concat(loader.load_csv_iter('results', chunksize=2), ignore_index=True)
+        
+        for df in (loaded, streamed):
+            assert df['position'].isna().tolist() == [False, True, False]
+            assert df['milliseconds'].isna().tolist() == [False, True, True]
+            assert df['position'].iloc[2] == 3
+            assert df['positionText'].iloc[1] == 'R'
+
+if __name__ == "__main__":
+    # Configure logging
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+        level="INFO"
+    )
+    
+    try:
+        test_malformed_numeric_values()
+    except AssertionError as e:
+        logger.error(f"Malformed value test failed: {e!r}")
+        sys.exit(1)
+    
+    logger.info("Both loaders coerced malformed values to nulls")
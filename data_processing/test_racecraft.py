@@ -6,6 +6,7 @@ import sys
 from pathlib import Path
 import pandas as pd
 from loguru import logger
+from sqlalchemy import text
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent))
@@ -13,6 +14,18 @@ sys.path.append(str(Path(__file__).parent))
 from utils.database import db_manager
 from calculators.racecraft_calculator import RacecraftCalculator
 
+# Queries for all tested drivers at once, so filtering happens in the database in one round trip per table
+DRIVER_QUERIES = {
+    'results': text("""
+        SELECT r.*, ra.year, ra.name, ra.date
+        FROM results r
+        JOIN races ra USING ("raceId")
+        WHERE r."driverId" = ANY(:driver_ids)
+    """),
+    'qualifying': text('SELECT * FROM qualifying WHERE "driverId" = ANY(:driver_ids)'),
+    'lap_times': text('SELECT * FROM lap_times WHERE "driverId" = ANY(:driver_ids)')
+}
+
 def test_racecraft_calculator():
     """Test racecraft calculator on a few drivers"""
     logger.info("Testing racecraft calculator...")
@@ -20,27 +33,14 @@ def test_racecraft_calculator():
     try:
         engine = db_manager.connect()
         
-        # Load core datasets
-        datasets = {
-            'drivers': "SELECT * FROM drivers",
-            'results': "SELECT * FROM results", 
-            'qualifying': "SELECT * FROM qualifying",
-            'lap_times': "SELECT * FROM lap_times LIMIT 50000",  # Limit for testing
-            'driver_standings': "SELECT * FROM driver_standings",
-            'races': "SELECT * FROM races"
-        }
-        
-        data_cache = {}
-        for name, query in datasets.items():
-            logger.info(f"Loading {name}...")
-            data_cache[name] = pd.read_sql(query, engine)
-            logger.info(f"Loaded {len(data_cache[name]):,} rows from {name}")
-        
-        # Merge race year data into results
-        races_subset = data_cache['races'][['raceId', 'year', 'name', 'date']].copy()
-        data_cache['results'] = data_cache['results'].merge(
-            races_subset, on='raceId', how='left'
-        )
+        # Only driver lookups and era-wide results are shared across drivers
+        drivers = pd.read_sql('SELECT "driverId", "driverRef" FROM drivers', engine)
+        all_results = pd.read_sql("""
+            SELECT r."raceId", r."driverId", r.position, ra.year
+            FROM results r
+            JOIN races ra USING ("raceId")
+        """, engine)
+        logger.info(f"Loaded {len(all_results):,} results for era comparisons")
         
         # Initialize racecraft calculator
         calculator = RacecraftCalculator()
@@ -54,28 +54,31 @@ def test_racecraft_calculator():
             ('vettel', 'Sebastian Vettel')
         ]
         
+        driver_ids = dict(zip(drivers['driverRef'], drivers['driverId'].astype(int)))
+        test_ids = [driver_ids[ref] for ref, _ in test_drivers if ref in driver_ids]
+        
+        # Load every tested driver's rows once and split them by driver
+        driver_tables = {}
+        for name, query in DRIVER_QUERIES.items():
+            table = pd.read_sql(query, engine, params={'driver_ids': test_ids})
+            driver_tables[name] = (table.iloc[:0], dict(tuple(table.groupby('driverId', sort=False))))
+        
         results = []
         
         for driver_ref, driver_name in test_drivers:
-            # Find driver ID
-            driver_info = data_cache['drivers'][
-                data_cache['drivers']['driverRef'] == driver_ref
-            ]
-            
-            if driver_info.empty:
+            if driver_ref not in driver_ids:
                 logger.warning(f"Driver {driver_name} not found")
                 continue
             
-            driver_id = driver_info['driverId'].iloc[0]
+            driver_id = driver_ids[driver_ref]
             logger.info(f"Testing racecraft for {driver_name} (ID: {driver_id})")
             
             # Get driver data
             driver_data = {
-                'results': data_cache['results'][data_cache['results']['driverId'] == driver_id].copy(),
-                'qualifying': data_cache['qualifying'][data_cache['qualifying']['driverId'] == driver_id].copy(),
-                'lap_times': data_cache['lap_times'][data_cache['lap_times']['driverId'] == driver_id].copy(),
-                'all_results': data_cache['results'].copy()
+                name: groups.get(driver_id, empty)
+                for name, (empty, groups) in driver_tables.items()
             }
+            driver_data['all_results'] = all_results
             
             if driver_data['results'].empty:
                 logger.warning(f"No results data for {driver_name}")
@@ -5,14 +5,12 @@ Test importing just a few races to isolate the issue
 import pandas as pd
 import sys
 from pathlib import Path
-from utils.database import db_manager
+from utils.database import db_manager, psql_insert_values
 
 def clean_data_for_db(df):
     """Clean DataFrame for database insertion"""
-    df_clean = df.copy()
-    
     # Replace NaN with None for proper NULL insertion
-    df_clean = df_clean.replace({pd.NaT: None, pd.NA: None})
+    df_clean = df.replace({pd.NaT: None, pd.NA: None})
     df_clean = df_clean.where(pd.notna(df_clean), None)
     
     # Handle string columns carefully - don't convert None to string
@@ -34,7 +32,7 @@ def main():
     print(f"Loaded {len(races_df)} races")
     
     # Take just first 3 races for testing
-    test_races = races_df.head(3).copy()
+    test_races = races_df.head(3)
     print(f"Testing with {len(test_races)} races")
     
     # Show the data
@@ -60,7 +58,7 @@ def main():
             conn.execute(text("DELETE FROM races WHERE \"raceId\" IN (1, 2, 3)"))
         
         print(f"\nAttempting import...")
-        test_races_clean.to_sql('races', engine, if_exists='append', index=False, method='multi')
+        test_races_clean.to_sql('races', engine, if_exists='append', index=False, method=psql_insert_values)
         print(f"SUCCESS: Imported {len(test_races_clean)} races")
         
     except Exception as e:
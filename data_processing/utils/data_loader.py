@@ -2,10 +2,28 @@
 CSV data loading utilities
 """
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from loguru import logger
 
+# F1 data NULL format
+NULL_VALUES = ['\\N', 'NULL', '']
+
+# Clock and lap time text that Arrow would otherwise infer as time-of-day values
+TEXT_COLUMNS = {
+    'time': pa.string(), 'duration': pa.string(), 'positionText': pa.string(),
+    'fastestLapTime': pa.string(), 'fastestLapSpeed': pa.string(),
+    'q1': pa.string(), 'q2': pa.string(), 'q3': pa.string(),
+    'fp1_time': pa.string(), 'fp2_time': pa.string(), 'fp3_time': pa.string(),
+    'quali_time': pa.string(), 'sprint_time': pa.string()
+}
+
+# Numeric columns holding fractional values; every other numeric column is integral
+FLOAT_COLUMNS = {'points', 'lat', 'lng', 'alt'}
+
 class F1DataLoader:
     """Loads and validates F1 CSV data"""
     
@@ -31,9 +49,44 @@ class F1DataLoader:
             'status': ['statusId', 'status'],
             'seasons': ['year', 'url']
         }
+        
+        # Columns parsed as dates and numbers, keyed by file
+        self.date_columns = {
+            'races': ['date', 'fp1_date', 'fp2_date', 'fp3_date', 'quali_date', 'sprint_date'],
+            'drivers': ['dob']
+        }
+        self.numeric_columns = {
+            'races': ['year', 'round'],
+            'results': ['grid', 'position', 'positionOrder', 'points', 'laps', 'milliseconds', 'fastestLap', 'rank'],
+            'qualifying': ['number', 'position'],
+            'lap_times': ['lap', 'position', 'milliseconds'],
+            'pit_stops': ['stop', 'lap', 'milliseconds'],
+            'driver_standings': ['points', 'position', 'wins'],
+            'constructor_standings': ['points', 'position', 'wins'],
+            'constructor_results': ['points'],
+            'sprint_results': ['number', 'grid', 'position', 'positionOrder', 'points', 'laps', 'milliseconds', 'fastestLap'],
+            'circuits': ['lat', 'lng', 'alt'],
+            'drivers': ['number'],
+            'seasons': ['year']
+        }
+        
+        # Specialize the parser types per file once, so columns are typed while parsing
+        self.column_types = {}
+        self.dtypes = {}
+        for filename in self.csv_files:
+            numeric_cols = self.numeric_columns.get(filename, [])
+            date_cols = self.date_columns.get(filename, [])
+            self.column_types[filename] = {
+                **TEXT_COLUMNS,
+                **{col: pa.float64() if col in FLOAT_COLUMNS else pa.int64() for col in numeric_cols},
+                **{col: pa.timestamp('s') for col in date_cols}
+            }
+            # Chunked reads leave numeric columns to inference: a forced dtype would raise on a
+            # malformed value, where _convert_data_types coerces it to null as load_csv does
+            self.dtypes[filename] = {col: 'str' for col in TEXT_COLUMNS}
     
-    def load_csv(self, filename: str, validate: bool = True) -> pd.DataFrame:
-        """Load a single CSV file with optional validation"""
+    def load_csv(self, filename: str, validate: bool = True, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load a single CSV file with optional validation, reading only usecols when given"""
         file_path = self.data_dir / f"{filename}.csv"
         
         if not file_path.exists():
@@ -42,16 +95,30 @@ class F1DataLoader:
         logger.info(f"Loading {filename}.csv...")
         
         try:
-            # Load with appropriate data types, handling F1 data NULL values
-            df = pd.read_csv(
-                file_path, 
-                low_memory=False,
-                na_values=['\\N', 'NULL', '']  # Handle F1 data NULL format
-            )
+            if usecols is not None:
+                header = pd.read_csv(file_path, nrows=0).columns
+                unknown_cols = [col for col in usecols if col not in header]
+                if unknown_cols:
+                    raise KeyError(f"Columns not found in {filename}.csv: {unknown_cols}")
+            
+            # Parse and type columns in one pass with Arrow's multithreaded CSV reader
+            column_types = self.column_types.get(filename, TEXT_COLUMNS)
+            try:
+                table = self._read_arrow(file_path, column_types, usecols)
+            except pa.ArrowInvalid as e:
+                # Malformed values fall back to inferred types and are coerced below;
+                # a read that forced no types beyond the text columns would only fail again
+                if column_types is TEXT_COLUMNS:
+                    raise
+                logger.warning(f"Typed parse of {filename}.csv failed, coercing instead: {e}")
+                table = self._read_arrow(file_path, TEXT_COLUMNS, usecols)
+            df = table.to_pandas()
             
             # Basic validation
             if validate and filename in self.csv_files:
                 expected_cols = self.csv_files[filename]
+                if usecols is not None:
+                    expected_cols = [col for col in expected_cols if col in usecols]
                 missing_cols = [col for col in expected_cols if col not in df.columns]
                 if missing_cols:
                     logger.warning(f"Missing expected columns in {filename}: {missing_cols}")
@@ -66,50 +133,95 @@ class F1DataLoader:
             logger.error(f"Error loading {filename}.csv: {e}")
             raise
     
-    def _convert_data_types(self, df: pd.DataFrame, filename: str) -> pd.DataFrame:
-        """Convert data types for better performance and accuracy"""
+    def load_csv_iter(self, filename: str, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """Stream a CSV file as typed chunks so memory stays bounded by chunksize, not file size"""
+        file_path = self.data_dir / f"{filename}.csv"
         
-        # Convert date columns
-        if filename == 'races':
-            date_cols = ['date', 'fp1_date', 'fp2_date', 'fp3_date', 'quali_date', 'sprint_date']
-            for col in date_cols:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
+        if not file_path.exists():
+            raise FileNotFoundError(f"CSV file {file_path} not found")
         
-        if filename == 'drivers':
-            if 'dob' in df.columns:
-                df['dob'] = pd.to_datetime(df['dob'], errors='coerce')
+        logger.info(f"Streaming {filename}.csv in chunks of {chunksize:,} rows...")
+        return self._iter_chunks(file_path, filename, chunksize)
+    
+    def _iter_chunks(self, file_path: Path, filename: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Yield converted chunks of a CSV file, validating columns on the first one"""
+        header = pd.read_csv(file_path, nrows=0).columns
+        with pd.read_csv(
+            file_path, chunksize=chunksize, engine='c',
+            na_values=NULL_VALUES, keep_default_na=False,
+            dtype=self.dtypes.get(filename, {}),
+            parse_dates=[col for col in self.date_columns.get(filename, []) if col in header]
+        ) as reader:
+            for i, chunk in enumerate(reader):
+                if i == 0 and filename in self.csv_files:
+                    missing_cols = [col for col in self.csv_files[filename] if col not in chunk.columns]
+                    if missing_cols:
+                        logger.warning(f"Missing expected columns in {filename}: {missing_cols}")
+                
+                yield self._convert_data_types(chunk, filename)
+    
+    def _read_arrow(self, file_path: Path, column_types: dict, usecols: Optional[List[str]]) -> pa.Table:
+        """Read a CSV file into an Arrow table with the given column types"""
+        return pa_csv.read_csv(
+            file_path,
+            convert_options=pa_csv.ConvertOptions(
+                null_values=NULL_VALUES,
+                strings_can_be_null=True,
+                column_types=column_types,
+                include_columns=usecols
+            )
+        )
+    
+    def _convert_data_types(self, df: pd.DataFrame, filename: str) -> pd.DataFrame:
+        """Coerce any date or numeric columns the parser could not type"""
+        for col in self.date_columns.get(filename, []):
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], errors='coerce')
         
-        # Convert numeric columns
-        numeric_conversions = {
-            'races': ['year', 'round'],
-            'results': ['grid', 'position', 'positionOrder', 'points', 'laps', 'milliseconds', 'fastestLap', 'rank'],
-            'qualifying': ['number', 'position'],
-            'lap_times': ['lap', 'position', 'milliseconds'],
-            'pit_stops': ['stop', 'lap', 'milliseconds'],
-            'driver_standings': ['points', 'position', 'wins'],
-            'constructor_standings': ['points', 'position', 'wins'],
-            'constructor_results': ['points'],
-            'sprint_results': ['number', 'grid', 'position', 'positionOrder', 'points', 'laps', 'milliseconds', 'fastestLap'],
-            'circuits': ['lat', 'lng', 'alt'],
-            'drivers': ['number'],
-            'seasons': ['year']
-        }
+        for col in self.numeric_columns.get(filename, []):
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        if filename in numeric_conversions:
-            for col in numeric_conversions[filename]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
+        return self._downcast_numeric(df, filename)
+    
+    def _downcast_numeric(self, df: pd.DataFrame, filename: str) -> pd.DataFrame:
+        """Shrink numeric and integer id columns to the narrowest dtype holding their values"""
+        id_cols = [col for col in df.columns if col.endswith('Id') and pd.api.types.is_integer_dtype(df[col])]
+        for col in self.numeric_columns.get(filename, []) + id_cols:
+            if col not in df.columns:
+                continue
+            
+            if col in FLOAT_COLUMNS:
+                df[col] = pd.to_numeric(df[col], downcast='float')
+                continue
+            
+            # Integer columns with nulls arrive as floats; keep them integral rather than float32,
+            # which cannot hold large millisecond totals exactly
+            values = df[col]
+            if pd.api.types.is_float_dtype(values):
+                present = values.dropna()
+                if not (present == present.round()).all():
+                    continue
+                values = values.astype('Int64')
+            df[col] = pd.to_numeric(values, downcast='integer')
         
         return df
     
-    def load_all_csvs(self) -> Dict[str, pd.DataFrame]:
-        """Load all CSV files and return as dictionary"""
+    def load_all_csvs(self, usecols: Optional[Dict[str, List[str]]] = None) -> Dict[str, pd.DataFrame]:
+        """Load all CSV files in parallel and return as dictionary, optionally limiting columns per file"""
         data = {}
+        usecols = usecols or {}
+        
+        # CSV parsing releases the GIL, so threads overlap I/O and parsing across files
+        with ThreadPoolExecutor(max_workers=min(8, len(self.csv_files))) as executor:
+            futures = {
+                filename: executor.submit(self.load_csv, filename, usecols=usecols.get(filename))
+                for filename in self.csv_files
+            }
         
-        for filename in self.csv_files.keys():
+        for filename, future in futures.items():
             try:
-                data[filename] = self.load_csv(filename)
+                data[filename] = future.result()
             except FileNotFoundError:
                 logger.warning(f"Skipping missing file: {filename}.csv")
                 continue
@@ -120,16 +232,19 @@ class F1DataLoader:
         logger.info(f"Successfully loaded {len(data)} CSV files")
         return data
     
-    def get_data_summary(self, data: Dict[str, pd.DataFrame]) -> Dict[str, dict]:
-        """Generate summary statistics for loaded data"""
+    def get_data_summary(self, data: Dict[str, pd.DataFrame], deep: bool = False) -> Dict[str, dict]:
+        """Generate summary statistics for loaded data, measuring string memory exactly only when deep"""
         summary = {}
         
         for name, df in data.items():
+            # count() tallies non-null values per column without building a boolean mask frame
+            null_counts = len(df) - df.count()
             summary[name] = {
                 'rows': len(df),
                 'columns': len(df.columns),
-                'memory_usage_mb': df.memory_usage(deep=True).sum() / 1024 / 1024,
-                'null_counts': df.isnull().sum().to_dict(),
+                'memory_usage_mb': df.memory_usage(deep=deep).sum() / 1024 / 1024,
+                'null_counts': null_counts.to_dict(),
+                'has_nulls': (null_counts > 0).to_dict(),
                 'date_range': None
             }
             
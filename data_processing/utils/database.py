@@ -2,14 +2,61 @@
 Database utilities for F1 data processing
 """
 import os
-from typing import Optional
-from sqlalchemy import create_engine, Engine
-from sqlalchemy.orm import sessionmaker, Session
+import io
+import csv
+import atexit
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from sqlalchemy import create_engine, make_url, text, Connection, Engine, MetaData, Table
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+import pandas as pd
+from pandas.api.types import is_scalar
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from loguru import logger
 
 load_dotenv()
 
+# Rows buffered per COPY/INSERT round trip in bulk_insert
+BULK_INSERT_CHUNK_ROWS = 50_000
+
+# Connection pool sized for the parallel timeline and DNA workers
+POOL_SIZE = 25
+POOL_MAX_OVERFLOW = 10
+POOL_RECYCLE_SECONDS = 1800
+
+# Rows per batched VALUES page when executemany inserts through SQLAlchemy Core
+EXECUTEMANY_PAGE_SIZE = 10_000
+
+# Name the ETL's sessions report in pg_stat_activity
+APPLICATION_NAME = 'racing-etl'
+
+def psql_insert_values(table, conn, keys, data_iter):
+    """pandas to_sql method that sends rows in pages through psycopg2's execute_values"""
+    columns = ', '.join(f'"{key}"' for key in keys)
+    table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    
+    with conn.connection.cursor() as cursor:
+        execute_values(cursor, f'INSERT INTO {table_name} ({columns}) VALUES %s', list(data_iter), page_size=1000)
+
+def _null_if_missing(value):
+    """Map NaN, NaT and pd.NA to None so they are written as NULL"""
+    return None if is_scalar(value) and pd.isna(value) else value
+
+def copy_rows(cursor, table_name: str, columns, rows) -> None:
+    """Stream row sequences into an already quoted table name with PostgreSQL COPY"""
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    
+    buffer = io.StringIO()
+    # An explicit NULL marker keeps empty strings distinct from missing values
+    csv.writer(buffer).writerows(
+        ['\\N' if _null_if_missing(value) is None else value for value in row] for row in rows
+    )
+    buffer.seek(0)
+    
+    cursor.copy_expert(f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
 class DatabaseManager:
     """Manages database connections and operations"""
     
@@ -21,36 +68,60 @@ class DatabaseManager:
         self.engine: Optional[Engine] = None
         self.SessionLocal = None
         
+        # Close pooled connections cleanly when a script exits
+        atexit.register(self.dispose)
+        
     def connect(self) -> Engine:
         """Create database engine and session factory"""
         if not self.engine:
+            # On psycopg2, executemany batches rows into VALUES pages (and text() statements
+            # through execute_batch) instead of one round trip per row
+            dialect_options = {
+                'connect_args': {'application_name': APPLICATION_NAME},
+                'executemany_mode': 'values_plus_batch',
+                'insertmanyvalues_page_size': EXECUTEMANY_PAGE_SIZE
+            } if make_url(self.database_url).get_driver_name() == 'psycopg2' else {}
             self.engine = create_engine(
                 self.database_url,
                 echo=False,  # Set to True for SQL debugging
+                poolclass=QueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=POOL_MAX_OVERFLOW,
+                pool_recycle=POOL_RECYCLE_SECONDS,
                 pool_pre_ping=True,
-                pool_recycle=300
+                **dialect_options
             )
-            self.SessionLocal = sessionmaker(
+            # One session per thread, reused across get_session() calls
+            self.SessionLocal = scoped_session(sessionmaker(
                 autocommit=False,
                 autoflush=False,
                 bind=self.engine
-            )
+            ))
             logger.info("Database connection established")
         
         return self.engine
     
+    def dispose(self) -> None:
+        """Close all pooled connections"""
+        if self.engine:
+            self.engine.dispose()
+    
     def get_session(self) -> Session:
-        """Get a database session"""
+        """Get the current thread's database session"""
         if not self.SessionLocal:
             self.connect()
         return self.SessionLocal()
     
     def execute_raw_sql(self, sql: str, params: Optional[dict] = None):
-        """Execute raw SQL query"""
-        with self.get_session() as session:
-            result = session.execute(sql, params or {})
+        """Execute raw SQL query on the current thread's session"""
+        session = self.get_session()
+        try:
+            result = session.execute(text(sql) if isinstance(sql, str) else sql, params or {})
             session.commit()
             return result
+        except Exception:
+            session.rollback()
+            raise
     
     def bulk_insert(self, table_name: str, data: list[dict]):
         """Perform bulk insert operation"""
@@ -59,19 +130,32 @@ class DatabaseManager:
             return
         
         engine = self.connect()
+        columns = list(dict.fromkeys(key for row in data for key in row))
+        
+        # Rows go out a chunk at a time straight from the dicts, never as one DataFrame
         with engine.begin() as conn:
-            # Use pandas for efficient bulk insert
-            import pandas as pd
-            df = pd.DataFrame(data)
-            df.to_sql(
-                name=table_name,
-                con=conn,
-                if_exists='append',
-                index=False,
-                method='multi'
-            )
+            # COPY goes through psycopg2's copy_expert; other drivers take the Core insert
+            if engine.dialect.driver == 'psycopg2':
+                with conn.connection.cursor() as cursor:
+                    for i in range(0, len(data), BULK_INSERT_CHUNK_ROWS):
+                        rows = ([row.get(column) for column in columns] for row in data[i:i + BULK_INSERT_CHUNK_ROWS])
+                        copy_rows(cursor, f'"{table_name}"', columns, rows)
+            else:
+                table = Table(table_name, MetaData(), autoload_with=conn)
+                for i in range(0, len(data), BULK_INSERT_CHUNK_ROWS):
+                    conn.execute(table.insert(), [
+                        {column: _null_if_missing(row.get(column)) for column in columns}
+                        for row in data[i:i + BULK_INSERT_CHUNK_ROWS]
+                    ])
+            
             logger.info(f"Bulk inserted {len(data)} records into {table_name}")
 
 
 # Global database manager instance
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = DatabaseManager()
+
+@contextmanager
+def scoped_conn(stream_results: bool = False) -> Iterator[Connection]:
+    """Borrow one pooled connection from the shared engine for a block of queries"""
+    with db_manager.connect().connect() as conn:
+        yield conn.execution_options(stream_results=True) if stream_results else conn
\ No newline at end of file
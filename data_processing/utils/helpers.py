@@ -6,21 +6,40 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from loguru import logger
+from numba import njit, prange
+from numba.types import Array, Tuple as NumbaTuple, boolean, float64, int64
 
-def calculate_era_weights(year: int, current_year: int = None) -> float:
+# Kernels below declare their signatures so numba compiles them eagerly at import
+# (or loads them from its on-disk cache) instead of on the first call. Inputs are
+# typed read-only so pandas' copy-on-write views are accepted alongside writable arrays
+FLOAT_ARRAY = Array(float64, 1, 'A', readonly=True)
+INT_ARRAY = Array(int64, 1, 'A', readonly=True)
+
+# Exponential decay: weight = e^(-lambda * years_ago)
+# Lambda = 0.1 gives reasonable decay over ~10 years
+ERA_DECAY_RATE = 0.1
+MIN_ERA_WEIGHT = 0.1
+
+@njit(float64[:](FLOAT_ARRAY, float64), cache=True)
+def _era_weights_kernel(years, current_year):
+    """Decay weight for each year, floored at the minimum weight"""
+    return np.maximum(np.exp(-ERA_DECAY_RATE * (current_year - years)), MIN_ERA_WEIGHT)
+
+def calculate_era_weights_array(years: np.ndarray, current_year: int = None) -> np.ndarray:
     """
-    Calculate exponential decay weight for historical data
-    More recent years get higher weight for DNA calculations
+    Calculate exponential decay weights for an array of years in one compiled pass
     """
     if current_year is None:
         current_year = datetime.now().year
     
-    years_ago = current_year - year
-    # Exponential decay: weight = e^(-lambda * years_ago)
-    # Lambda = 0.1 gives reasonable decay over ~10 years
-    decay_rate = 0.1
-    weight = np.exp(-decay_rate * years_ago)
-    return max(weight, 0.1)  # Minimum weight of 0.1
+    return _era_weights_kernel(np.asarray(years, dtype=np.float64), float(current_year))
+
+def calculate_era_weights(year: int, current_year: int = None) -> float:
+    """
+    Calculate exponential decay weight for historical data
+    More recent years get higher weight for DNA calculations
+    """
+    return float(calculate_era_weights_array(np.array([year]), current_year)[0])
 
 def normalize_to_percentile(values: pd.Series, min_score: int = 0, max_score: int = 100) -> pd.Series:
     """
@@ -34,12 +53,14 @@ def normalize_to_percentile(values: pd.Series, min_score: int = 0, max_score: in
     if len(valid_values) == 0:
         return pd.Series([np.nan] * len(values))
     
-    # Calculate percentile ranks
-    percentiles = valid_values.rank(pct=True) * 100
+    # Average ranks from one sort: ties share the mean of the positions they span, as rank(pct=True)
+    arr = valid_values.to_numpy(dtype=np.float64)
+    sorted_arr = np.sort(arr)
+    ranks = (np.searchsorted(sorted_arr, arr, side='left') + np.searchsorted(sorted_arr, arr, side='right') + 1) / 2
     
     # Map back to original series
-    result = pd.Series([np.nan] * len(values), index=values.index)
-    result.loc[valid_values.index] = percentiles
+    result = pd.Series(np.nan, index=values.index)
+    result[values.notna().to_numpy()] = ranks / len(arr) * 100
     
     # Scale to desired range
     if min_score != 0 or max_score != 100:
@@ -53,60 +74,120 @@ def calculate_teammate_baseline(df: pd.DataFrame, driver_col: str = 'driverId',
     """
     Calculate teammate performance baseline for normalization
     """
-    # Group by constructor and race to get teammate comparisons
-    baseline_data = []
+    # Broadcast per constructor/race group stats back onto each row in one pass
+    grouped = df.groupby([constructor_col, 'raceId'])[metric_col]
+    group_size = grouped.transform('size')
+    # Any missing metric makes the teammate average missing, as np.mean would
+    teammate_avg = grouped.transform('mean').where(grouped.transform('count') == group_size)
     
-    for (constructor, race), group in df.groupby([constructor_col, 'raceId']):
-        if len(group) < 2:  # Need at least 2 drivers for comparison
-            continue
-            
-        drivers = group[driver_col].tolist()
-        metrics = group[metric_col].tolist()
-        
-        # Calculate relative performance for each driver
-        mean_metric = np.mean(metrics)
-        for driver, metric in zip(drivers, metrics):
-            baseline_data.append({
-                'driverId': driver,
-                'raceId': race,
-                'constructorId': constructor,
-                'metric_value': metric,
-                'teammate_avg': mean_metric,
-                'relative_performance': metric - mean_metric
-            })
-    
-    return pd.DataFrame(baseline_data)
+    # Need at least 2 drivers for comparison
+    mask = group_size >= 2
+    baseline = df.loc[mask, [driver_col, 'raceId', constructor_col, metric_col]]
+    baseline.columns = ['driverId', 'raceId', 'constructorId', 'metric_value']
+    baseline['teammate_avg'] = teammate_avg[mask]
+    baseline['relative_performance'] = baseline['metric_value'] - baseline['teammate_avg']
+    
+    return baseline.sort_values(['constructorId', 'raceId'], kind='stable').reset_index(drop=True)
+
+@njit(boolean[:](FLOAT_ARRAY, float64), cache=True, error_model='numpy')
+def _zscore_outliers(values, threshold):
+    """Flag values whose z-score exceeds threshold, with Welford's mean/variance over non-NaN values"""
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in values:
+        if not np.isnan(x):
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+    
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+    
+    mask = np.empty(len(values), dtype=np.bool_)
+    for i in range(len(values)):
+        mask[i] = np.abs((values[i] - mean) / std) > threshold
+    return mask
 
 def detect_outliers(series: pd.Series, method: str = 'iqr', threshold: float = 1.5) -> pd.Series:
     """
     Detect outliers in a data series
     """
     if method == 'iqr':
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
+        # Both quartiles from a single selection pass
+        Q1, Q3 = series.quantile([0.25, 0.75])
         IQR = Q3 - Q1
         lower_bound = Q1 - threshold * IQR
         upper_bound = Q3 + threshold * IQR
         return (series < lower_bound) | (series > upper_bound)
     
     elif method == 'zscore':
-        z_scores = np.abs((series - series.mean()) / series.std())
-        return z_scores > threshold
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return pd.Series(_zscore_outliers(values, float(threshold)), index=series.index, name=series.name)
     
     else:
         raise ValueError("Method must be 'iqr' or 'zscore'")
 
+@njit(float64[:](FLOAT_ARRAY, INT_ARRAY, INT_ARRAY, int64), parallel=True, cache=True)
+def _rolling_mean_groups(values, starts, ends, window):
+    """Trailing mean over each contiguous group run, keeping a running sum instead of re-summing windows"""
+    result = np.full(len(values), np.nan)
+    for g in prange(len(starts)):
+        total = 0.0
+        count = 0
+        for i in range(starts[g], ends[g]):
+            if not np.isnan(values[i]):
+                total += values[i]
+                count += 1
+            if i - window >= starts[g] and not np.isnan(values[i - window]):
+                total -= values[i - window]
+                count -= 1
+            if count > 0:
+                result[i] = total / count
+    return result
+
 def calculate_moving_average(df: pd.DataFrame, value_col: str, 
                            window: int = 5, groupby_cols: List[str] = None) -> pd.Series:
     """
     Calculate moving average with optional grouping
     """
     if groupby_cols:
-        return df.groupby(groupby_cols)[value_col].transform(
-            lambda x: x.rolling(window=window, min_periods=1).mean()
-        )
+        # Rows with a missing group key get no group, as in groupby
+        group_ids = df.groupby(groupby_cols, sort=False).ngroup().to_numpy()
     else:
-        return df[value_col].rolling(window=window, min_periods=1).mean()
+        group_ids = np.zeros(len(df), dtype=np.int64)
+    
+    # Lay each group out contiguously, keeping row order within groups
+    order = np.argsort(group_ids, kind='stable')
+    sorted_ids = group_ids[order]
+    boundaries = np.flatnonzero(np.diff(sorted_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(sorted_ids)]))
+    keep = sorted_ids[starts] >= 0 if len(sorted_ids) else np.zeros(0, dtype=bool)
+    
+    values = df[value_col].to_numpy(dtype=np.float64)[order]
+    averages = np.full(len(df), np.nan)
+    averages[order] = _rolling_mean_groups(values, starts[keep], ends[keep], window)
+    return pd.Series(averages, index=df.index, name=value_col)
+
+# Signed decimal or exponent number, as float() reads it, e.g. '83.456', '.5' or '1e2'
+LAP_TIME_NUMBER = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+
+# Optional minutes followed by seconds, e.g. '1:23.456' or '83.456', ignoring surrounding whitespace
+LAP_TIME_PATTERN = rf'^\s*(?:({LAP_TIME_NUMBER})\s*:\s*)?({LAP_TIME_NUMBER})\s*$'
+
+def parse_lap_times(times: pd.Series) -> pd.Series:
+    """
+    Parse lap time strings (e.g., '1:23.456') to total seconds in one vectorized pass
+    """
+    # Only strings are parsed, so a numeric or all-NaN float Series has nothing to read
+    if not pd.api.types.is_string_dtype(times.dtype):
+        return pd.Series(np.nan, index=times.index, name=times.name)
+    
+    parts = times.str.extract(LAP_TIME_PATTERN)
+    minutes = pd.to_numeric(parts[0], errors='coerce').fillna(0)
+    seconds = pd.to_numeric(parts[1], errors='coerce')
+    return minutes * 60 + seconds
 
 def parse_lap_time(time_str: str) -> Optional[float]:
     """
@@ -119,14 +200,12 @@ def parse_lap_time(time_str: str) -> Optional[float]:
         # Handle different time formats
         if ':' in time_str:
             # Format: M:SS.mmm or MM:SS.mmm
-            parts = time_str.split(':')
-            minutes = float(parts[0])
-            seconds = float(parts[1])
-            return minutes * 60 + seconds
+            minutes, seconds = time_str.split(':')
+            return float(minutes) * 60 + float(seconds)
         else:
             # Just seconds
             return float(time_str)
-    except (ValueError, IndexError):
+    except ValueError:
         return None
 
 def calculate_position_changes(qualifying_df: pd.DataFrame, 
@@ -134,12 +213,10 @@ def calculate_position_changes(qualifying_df: pd.DataFrame,
     """
     Calculate position changes from qualifying to race finish
     """
-    # Merge qualifying and results data
-    merged = qualifying_df.merge(
-        results_df,
-        on=['raceId', 'driverId'],
-        suffixes=('_quali', '_race')
-    )
+    # Merge only the columns used below rather than both frames in full
+    quali = qualifying_df[['raceId', 'driverId', 'position']].rename(columns={'position': 'position_quali'})
+    race = results_df[['raceId', 'driverId', 'grid', 'position']].rename(columns={'position': 'position_race'})
+    merged = quali.merge(race, on=['raceId', 'driverId'])
     
     # Calculate position changes
     merged['positions_gained'] = merged['position_quali'] - merged['position_race']
@@ -152,30 +229,65 @@ def identify_championship_decisive_races(driver_standings_df: pd.DataFrame,
     """
     Identify races where championship lead changed hands or was decided
     """
-    season_standings = driver_standings_df[
-        driver_standings_df['raceId'].str.contains(str(year), na=False)
-    ].copy()
+    # Filter on a year column when present; otherwise fall back to a literal match inside raceId
+    if 'year' in driver_standings_df.columns:
+        in_season = driver_standings_df['year'] == year
+    else:
+        in_season = driver_standings_df['raceId'].astype('str').str.contains(str(year), regex=False, na=False)
+    season_standings = driver_standings_df[in_season]
     
     if season_standings.empty:
         return []
     
-    # Sort by race order and get championship leader after each race
-    season_standings['race_order'] = season_standings.groupby('raceId')['raceId'].transform('first')
-    season_standings = season_standings.sort_values(['race_order', 'position'])
+    # Championship leader after each race is the first row of each race in race/position order
+    leaders = (
+        season_standings.sort_values(['raceId', 'position'])
+        .drop_duplicates('raceId')
+        .set_index('raceId')['driverId']
+    )
+    previous_leaders = leaders.shift()
+    changed = leaders.ne(previous_leaders) & previous_leaders.notna()
     
-    championship_changing_races = []
-    previous_leader = None
+    return leaders.index[changed].tolist()
+
+@njit(NumbaTuple((float64, float64, int64, int64))(FLOAT_ARRAY, FLOAT_ARRAY), cache=True)
+def _consistency_stats(points, positions):
+    """
+    Points coefficient of variation, finishing position std dev, DNF count and
+    points-scoring race count in one pass, with Welford updates over non-NaN values
+    """
+    points_n = 0
+    points_mean = 0.0
+    points_m2 = 0.0
+    scoring = 0
+    position_n = 0
+    position_mean = 0.0
+    position_m2 = 0.0
+    dnfs = 0
     
-    for race_id in season_standings['raceId'].unique():
-        race_standings = season_standings[season_standings['raceId'] == race_id]
-        current_leader = race_standings.iloc[0]['driverId']
+    for i in range(len(points)):
+        p = points[i]
+        if not np.isnan(p):
+            points_n += 1
+            delta = p - points_mean
+            points_mean += delta / points_n
+            points_m2 += delta * (p - points_mean)
+            if p > 0:
+                scoring += 1
         
-        if previous_leader and current_leader != previous_leader:
-            championship_changing_races.append(race_id)
-        
-        previous_leader = current_leader
+        pos = positions[i]
+        if np.isnan(pos):
+            dnfs += 1
+        else:
+            position_n += 1
+            delta = pos - position_mean
+            position_mean += delta / position_n
+            position_m2 += delta * (pos - position_mean)
     
-    return championship_changing_races
+    points_std = np.sqrt(points_m2 / (points_n - 1)) if points_n > 1 else np.nan
+    points_cv = points_std / points_mean if points_n > 0 and points_mean > 0 else np.inf
+    position_std = np.sqrt(position_m2 / (position_n - 1)) if position_n > 1 else np.nan
+    return points_cv, position_std, dnfs, scoring
 
 def calculate_consistency_metrics(driver_results: pd.DataFrame) -> Dict[str, float]:
     """
@@ -184,38 +296,76 @@ def calculate_consistency_metrics(driver_results: pd.DataFrame) -> Dict[str, flo
     if driver_results.empty:
         return {}
     
-    # Points scoring consistency
-    points_std = driver_results['points'].std()
-    points_mean = driver_results['points'].mean()
-    points_cv = points_std / points_mean if points_mean > 0 else np.inf
-    
-    # Finishing position consistency
-    finish_positions = driver_results['position'].dropna()
-    position_std = finish_positions.std() if not finish_positions.empty else np.nan
+    points = driver_results['points'].to_numpy(dtype=np.float64, na_value=np.nan)
+    positions = driver_results['position'].to_numpy(dtype=np.float64, na_value=np.nan)
+    points_cv, position_std, dnf_count, points_scoring_races = _consistency_stats(points, positions)
     
-    # DNF rate
     total_races = len(driver_results)
-    dnf_count = driver_results['position'].isna().sum()
-    dnf_rate = dnf_count / total_races if total_races > 0 else 0
-    
-    # Points scoring rate
-    points_scoring_races = (driver_results['points'] > 0).sum()
-    points_scoring_rate = points_scoring_races / total_races if total_races > 0 else 0
     
     return {
         'points_coefficient_of_variation': points_cv,
         'position_std_dev': position_std,
-        'dnf_rate': dnf_rate,
-        'points_scoring_rate': points_scoring_rate,
+        'dnf_rate': dnf_count / total_races,
+        'points_scoring_rate': points_scoring_races / total_races,
         'total_races': total_races
     }
 
+@njit(NumbaTuple((float64[:], float64[:], int64[:], int64[:]))(FLOAT_ARRAY, FLOAT_ARRAY, INT_ARRAY, INT_ARRAY),
+      parallel=True, cache=True)
+def _consistency_stats_groups(points, positions, starts, ends):
+    """_consistency_stats over each contiguous group run, one group per parallel iteration"""
+    n_groups = len(starts)
+    points_cv = np.empty(n_groups)
+    position_std = np.empty(n_groups)
+    dnfs = np.empty(n_groups, dtype=np.int64)
+    scoring = np.empty(n_groups, dtype=np.int64)
+    for g in prange(n_groups):
+        points_cv[g], position_std[g], dnfs[g], scoring[g] = _consistency_stats(
+            points[starts[g]:ends[g]], positions[starts[g]:ends[g]]
+        )
+    return points_cv, position_std, dnfs, scoring
+
+def calculate_consistency_metrics_bulk(df: pd.DataFrame, driver_col: str = 'driverId') -> pd.DataFrame:
+    """
+    Calculate consistency metrics for every driver in one pass, indexed by driver
+    """
+    codes, drivers = pd.factorize(df[driver_col], sort=True)
+    
+    # Lay each driver's rows out contiguously, keeping race order within drivers;
+    # rows without a driver id sort first and are left out
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(drivers)), side='left')
+    ends = np.searchsorted(sorted_codes, np.arange(len(drivers)), side='right')
+    
+    points = df['points'].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    positions = df['position'].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    points_cv, position_std, dnf_count, points_scoring_races = _consistency_stats_groups(
+        points, positions, starts, ends
+    )
+    
+    total_races = ends - starts
+    return pd.DataFrame({
+        'points_coefficient_of_variation': points_cv,
+        'position_std_dev': position_std,
+        'dnf_rate': dnf_count / total_races,
+        'points_scoring_rate': points_scoring_races / total_races,
+        'total_races': total_races
+    }, index=pd.Index(drivers, name=driver_col))
+
 def safe_divide(numerator: pd.Series, denominator: pd.Series, 
                 default_value: float = 0.0) -> pd.Series:
     """
     Safely divide two series, handling division by zero
     """
-    result = numerator / denominator
-    result = result.replace([np.inf, -np.inf], default_value)
-    result = result.fillna(default_value)
-    return result
\ No newline at end of file
+    numerator, denominator = numerator.align(denominator)
+    
+    # One division and one select; errstate silences the inf/nan warnings the select discards
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.divide(
+            numerator.to_numpy(dtype=np.float64, na_value=np.nan),
+            denominator.to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+    
+    name = numerator.name if numerator.name == denominator.name else None
+    return pd.Series(np.where(np.isfinite(result), result, default_value), index=numerator.index, name=name)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Wikipedia API helpers for driver image lookups
+"""
+from typing import Dict, Iterator, List
+from urllib.parse import unquote, urlencode
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+
+# MediaWiki accepts at most 50 titles per query for regular clients
+MAX_TITLES_PER_QUERY = 50
+
+# Width of the thumbnails requested from Wikipedia
+IMAGE_SIZE_PX = 400
+
+# Throttled (429) and transient server errors are retried with exponential backoff
+MAX_RETRIES = 5
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def page_title_from_url(wikipedia_url: str) -> str:
+    """Extract the page title from a Wikipedia article URL"""
+    return unquote(wikipedia_url.rsplit('/', 1)[-1])
+
+def chunk_titles(titles: List[str], size: int = MAX_TITLES_PER_QUERY) -> Iterator[List[str]]:
+    """Split page titles into batches small enough for a single API query"""
+    for i in range(0, len(titles), size):
+        yield titles[i:i + size]
+
+def page_images_url(titles: List[str]) -> str:
+    """Build a pageimages query URL returning thumbnails for all given titles"""
+    params = {
+        'action': 'query',
+        'format': 'json',
+        'formatversion': 2,
+        'prop': 'pageimages',
+        'piprop': 'thumbnail',
+        'pithumbsize': IMAGE_SIZE_PX,
+        'pilimit': MAX_TITLES_PER_QUERY,
+        'redirects': 1,
+        'titles': '|'.join(titles)
+    }
+    return f"{WIKIPEDIA_API_URL}?{urlencode(params)}"
+
+def parse_page_images(data: dict, titles: List[str]) -> Dict[str, str]:
+    """
+    Map each requested title to its thumbnail URL
+    
+    The API answers with normalized/redirected page titles, so requested
+    titles are resolved through the 'normalized' and 'redirects' entries.
+    """
+    query = data.get('query', {})
+    normalized = {entry['from']: entry['to'] for entry in query.get('normalized', [])}
+    redirects = {entry['from']: entry['to'] for entry in query.get('redirects', [])}
+    thumbnails = {
+        page['title']: page['thumbnail']['source']
+        for page in query.get('pages', [])
+        if 'thumbnail' in page
+    }
+    
+    image_urls = {}
+    for title in titles:
+        page_title = normalized.get(title, title)
+        page_title = redirects.get(page_title, page_title)
+        if page_title in thumbnails:
+            image_urls[title] = thumbnails[page_title]
+    
+    return image_urls
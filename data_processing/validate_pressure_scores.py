@@ -5,106 +5,92 @@ Validate Pressure Performance scores for notable F1 drivers
 import sys
 import os
 from pathlib import Path
-import pandas as pd
+import math
+import statistics
 from loguru import logger
+from sqlalchemy import text
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent))
 
-from utils.database import db_manager
+from utils.database import scoped_conn
+
+# Rows fetched per round trip from the server-side cursor
+PROFILE_CHUNK_ROWS = 5000
+
+NOTABLE_DRIVERS = [
+    'Lewis Hamilton', 'Michael Schumacher', 'Sebastian Vettel',
+    'Fernando Alonso', 'Max Verstappen', 'Ayrton Senna',
+    'Alain Prost', 'Nico Rosberg', 'Valtteri Bottas',
+    'Kimi Raikkonen', 'Felipe Massa', 'Rubens Barrichello',
+    'Daniel Ricciardo', 'Charles Leclerc', 'Lando Norris'
+]
+
+def format_score(value, width: int) -> str:
+    """Format a nullable score column, printing nan for NULL like the old DataFrame output"""
+    return f'{math.nan if value is None else value:{width}.1f}'
 
 def validate_pressure_scores():
     """Validate pressure performance scores for well-known drivers"""
     logger.info("Validating pressure performance scores...")
     
     try:
-        engine = db_manager.connect()
-        
-        # Get notable drivers' pressure scores
+        # Load every scored profile once; the notable, top, bottom and summary views are sliced from it
         query = '''
         SELECT dp."driverName", dp."pressurePerformanceScore", dp."racesAnalyzed", dp."careerSpan"
         FROM drivers_dna_profiles dp 
-        WHERE dp."pressurePerformanceScore" IS NOT NULL 
-        AND dp."driverName" IN (
-            'Lewis Hamilton', 'Michael Schumacher', 'Sebastian Vettel', 
-            'Fernando Alonso', 'Max Verstappen', 'Ayrton Senna',
-            'Alain Prost', 'Nico Rosberg', 'Valtteri Bottas',
-            'Kimi Raikkonen', 'Felipe Massa', 'Rubens Barrichello',
-            'Daniel Ricciardo', 'Charles Leclerc', 'Lando Norris'
-        )
-        ORDER BY dp."pressurePerformanceScore" DESC
+        WHERE dp."pressurePerformanceScore" IS NOT NULL
         '''
         
-        results = pd.read_sql(query, engine)
+        # Stream through a server-side cursor so the driver never buffers the whole result
+        with scoped_conn(stream_results=True) as conn:
+            profiles = list(conn.execute(text(query)).yield_per(PROFILE_CHUNK_ROWS))
+        ranked = sorted(profiles, key=lambda row: row.pressurePerformanceScore, reverse=True)
+        
+        results = [row for row in ranked if row.driverName in NOTABLE_DRIVERS]
         
         print('\nNotable Drivers Pressure Performance Scores:')
         print('=' * 70)
         print(f'{"Driver Name":20} | {"Score":>6} | {"Races":>6} | {"Career":>12}')
         print('-' * 70)
         
-        for _, row in results.iterrows():
-            print(f'{row["driverName"]:20} | {row["pressurePerformanceScore"]:6.1f} | {row["racesAnalyzed"]:6d} | {row["careerSpan"]:>12}')
-        
-        # Get top 10 pressure performers
-        top_query = '''
-        SELECT dp."driverName", dp."pressurePerformanceScore", dp."racesAnalyzed"
-        FROM drivers_dna_profiles dp 
-        WHERE dp."pressurePerformanceScore" IS NOT NULL 
-        AND dp."racesAnalyzed" >= 20
-        ORDER BY dp."pressurePerformanceScore" DESC
-        LIMIT 10
-        '''
+        for row in results:
+            print(f'{row.driverName:20} | {format_score(row.pressurePerformanceScore, 6)} | {row.racesAnalyzed:6d} | {row.careerSpan:>12}')
         
-        top_results = pd.read_sql(top_query, engine)
+        # Top 10 among drivers with at least 20 races
+        experienced = [row for row in ranked if row.racesAnalyzed >= 20]
+        top_results = experienced[:10]
         
         print('\n\nTop 10 Pressure Performers (min 20 races):')
         print('=' * 50)
         print(f'{"Rank":>4} | {"Driver Name":20} | {"Score":>6} | {"Races":>6}')
         print('-' * 50)
         
-        for i, row in top_results.iterrows():
-            print(f'{i+1:4d} | {row["driverName"]:20} | {row["pressurePerformanceScore"]:6.1f} | {row["racesAnalyzed"]:6d}')
+        for i, row in enumerate(top_results):
+            print(f'{i+1:4d} | {row.driverName:20} | {format_score(row.pressurePerformanceScore, 6)} | {row.racesAnalyzed:6d}')
             
-        # Get bottom 10 pressure performers  
-        bottom_query = '''
-        SELECT dp."driverName", dp."pressurePerformanceScore", dp."racesAnalyzed"
-        FROM drivers_dna_profiles dp 
-        WHERE dp."pressurePerformanceScore" IS NOT NULL 
-        AND dp."racesAnalyzed" >= 20
-        ORDER BY dp."pressurePerformanceScore" ASC
-        LIMIT 10
-        '''
-        
-        bottom_results = pd.read_sql(bottom_query, engine)
+        # Bottom 10 among drivers with at least 20 races
+        bottom_results = sorted(experienced, key=lambda row: row.pressurePerformanceScore)[:10]
         
         print('\n\nLowest 10 Pressure Performers (min 20 races):')
         print('=' * 50)
         print(f'{"Rank":>4} | {"Driver Name":20} | {"Score":>6} | {"Races":>6}')
         print('-' * 50)
         
-        for i, row in bottom_results.iterrows():
-            print(f'{i+1:4d} | {row["driverName"]:20} | {row["pressurePerformanceScore"]:6.1f} | {row["racesAnalyzed"]:6d}')
+        for i, row in enumerate(bottom_results):
+            print(f'{i+1:4d} | {row.driverName:20} | {format_score(row.pressurePerformanceScore, 6)} | {row.racesAnalyzed:6d}')
             
         # Summary statistics
-        stats_query = '''
-        SELECT 
-            COUNT(*) as total_drivers,
-            AVG(dp."pressurePerformanceScore") as avg_score,
-            MIN(dp."pressurePerformanceScore") as min_score,
-            MAX(dp."pressurePerformanceScore") as max_score,
-            STDDEV(dp."pressurePerformanceScore") as std_dev
-        FROM drivers_dna_profiles dp 
-        WHERE dp."pressurePerformanceScore" IS NOT NULL
-        '''
-        
-        stats = pd.read_sql(stats_query, engine)
+        scores = [row.pressurePerformanceScore for row in profiles]
+        average = statistics.fmean(scores) if scores else math.nan
+        std_dev = statistics.stdev(scores) if len(scores) > 1 else math.nan
         
         print('\n\nPressure Performance Score Statistics:')
         print('=' * 40)
-        print(f'Total Drivers Analyzed: {stats["total_drivers"].iloc[0]}')
-        print(f'Average Score: {stats["avg_score"].iloc[0]:.2f}')
-        print(f'Score Range: {stats["min_score"].iloc[0]:.1f} - {stats["max_score"].iloc[0]:.1f}')
-        print(f'Standard Deviation: {stats["std_dev"].iloc[0]:.2f}')
+        print(f'Total Drivers Analyzed: {len(scores)}')
+        print(f'Average Score: {average:.2f}')
+        print(f'Score Range: {min(scores, default=math.nan):.1f} - {max(scores, default=math.nan):.1f}')
+        print(f'Standard Deviation: {std_dev:.2f}')
         
         return True
         